@@ -19,6 +19,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -85,11 +86,44 @@ DJOSER = {
     'HIDE_USERS': False,
 }
 
+# Общий для всех воркеров кэш: по версиям в нём процессы узнают,
+# что локальные индексы (ингредиенты и т. п.) устарели. В нём же живут
+# версии и данные по каждому пользователю, поэтому по умолчанию — Redis
+# с вытеснением LRU (см. infra/docker-compose.override.yml): потеря
+# версии только сбрасывает зависящие от неё ключи.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', 'redis://redis:6379/1'),
+    }
+}
+if CACHE_BACKEND.endswith('FileBasedCache'):
+    # Запасной вариант без Redis. При переполнении каждый set() обходит
+    # весь каталог и удаляет треть файлов, поэтому лимит берём с запасом
+    # на ключи всех пользователей — ценой диска и медленной чистки.
+    CACHES['default']['LOCATION'] = os.getenv(
+        'CACHE_LOCATION', '/tmp/foodgram_cache')
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 200_000)),
+    }
+
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    # файлы именуются хешем содержимого: одинаковые загрузки не дублируются
+    'default': {
+        'BACKEND': 'recipes.storage.ContentHashStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -0,0 +1,39 @@
+# add_components/management/commands/generate_renditions.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.cache import RECIPE_VERSION, USER_VERSION, bump_version
+from recipes.models import Recipe
+from recipes.renditions import make_renditions
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumbnails for recipe images and avatars'
+
+    def handle(self, *args, **kwargs):
+        started, done, failed = time.monotonic(), 0, 0
+        # ответы с этими объектами закэшированы со ссылками на оригинал
+        sources = (
+            (Recipe, 'image', RECIPE_VERSION),
+            (User, 'avatar', USER_VERSION),
+        )
+        for model, field, version in sources:
+            rows = (model.objects.exclude(**{field: ''})
+                    .exclude(**{f'{field}__isnull': True})
+                    .values_list('pk', field).iterator())
+            storage = model._meta.get_field(field).storage
+            for pk, name in rows:
+                try:
+                    if make_renditions(storage, name):
+                        bump_version(version.format(pk))
+                    done += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{name}: {exc}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {done} images ({failed} failed) '
+            f'in {time.monotonic() - started:.1f}s'))
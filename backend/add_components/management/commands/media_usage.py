@@ -0,0 +1,79 @@
+# add_components/management/commands/media_usage.py
+import posixpath
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.renditions import RENDITION_FORMATS, RENDITION_SIZES
+from recipes.storage import MEDIA_FIELDS, release
+
+
+def _walk(storage, directory):
+    if not storage.exists(directory):
+        return
+    dirs, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for sub in dirs:
+        yield from _walk(storage, posixpath.join(directory, sub))
+
+
+def _is_rendition(name):
+    parts = name.rsplit('.', 2)
+    return (len(parts) == 3 and parts[1] in RENDITION_SIZES
+            and parts[2] in RENDITION_FORMATS)
+
+
+class Command(BaseCommand):
+    help = 'Report media deduplication savings and collect orphaned files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--collect', action='store_true',
+            help='Delete files (and thumbnails) nobody references',
+        )
+
+    def handle(self, *args, collect=False, **kwargs):
+        storage = default_storage
+        references = Counter()
+        for model, field in MEDIA_FIELDS:
+            references.update(
+                model.objects.exclude(**{f'{field}__isnull': True})
+                .exclude(**{field: ''})
+                .values_list(field, flat=True).iterator())
+
+        stored = logical = missing = 0
+        for name, refs in references.items():
+            try:
+                size = storage.size(name)
+            except OSError:
+                missing += 1
+                continue
+            stored += size
+            logical += size * refs
+        self.stdout.write(
+            f'{sum(references.values())} references, '
+            f'{len(references)} files, {missing} missing\n'
+            f'stored {stored / 2**20:.1f} MB, without dedup '
+            f'{logical / 2**20:.1f} MB, saved '
+            f'{(logical - stored) / 2**20:.1f} MB')
+
+        directories = {
+            model._meta.get_field(field).upload_to.rstrip('/')
+            for model, field in MEDIA_FIELDS
+        }
+        orphans = [
+            name
+            for directory in directories
+            for name in _walk(storage, directory)
+            if not _is_rendition(name) and name not in references
+        ]
+        orphan_bytes = sum(storage.size(name) for name in orphans)
+        self.stdout.write(f'{len(orphans)} orphaned files, '
+                          f'{orphan_bytes / 2**20:.1f} MB')
+        if collect:
+            collected = sum(release(storage, name) for name in orphans)
+            self.stdout.write(self.style.SUCCESS(
+                f'Collected {collected} files, '
+                f'{len(orphans) - collected} kept as recently used'))
@@ -0,0 +1,20 @@
+# add_components/management/commands/reconcile_counters.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, actual_count
+
+
+class Command(BaseCommand):
+    help = 'Recount denormalized favorites/carts/recipes/followers counters'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            for model, field, source, fk in COUNTERS:
+                actual = actual_count(source, fk)
+                fixed = (model.objects
+                         .exclude(**{field: actual})
+                         .update(**{field: actual}))
+                self.stdout.write(
+                    f'{model._meta.label}.{field}: fixed {fixed} rows')
+        self.stdout.write(self.style.SUCCESS('Counters reconciled'))
@@ -0,0 +1,123 @@
+# add_components/management/commands/refresh_rankings.py
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from recipes.models import (
+    Favorite, RankingEvent, RecipeRanking, ShoppingCart,
+)
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE = timedelta(days=3)
+DECAY = math.log(2) / HALF_LIFE.total_seconds()
+# Событие засчитывается с задержкой: строки, закоммиченные чуть позже
+# своего created, не проскочат мимо водяного знака
+REFRESH_LAG = timedelta(minutes=1)
+WEIGHTS = ((Favorite, 2.0), (ShoppingCart, 1.0))
+BATCH_SIZE = 1000
+# ─────────────────────────────────────────────────────────────────────
+
+
+def log_weight(weight, moment):
+    """ln(w·e^{λ(t − EPOCH)}) — вклад события в trending_score."""
+    return math.log(weight) + DECAY * (moment - EPOCH).total_seconds()
+
+
+def log_add(a, b):
+    """ln(e^a + e^b) без переполнения."""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def first_events(model, rows):
+    """
+    Строки (user_id, recipe_id, created), которые этот пользователь ещё
+    не засчитывал этому рецепту: после удаления и повторного добавления
+    событие не учитывается второй раз. Учтённые пары запоминаются в
+    RankingEvent — проверка идёт пачками по BATCH_SIZE.
+    """
+    kind = model._meta.model_name
+    rows = iter(rows)
+    while batch := list(islice(rows, BATCH_SIZE)):
+        counted = set(
+            RankingEvent.objects.filter(
+                kind=kind,
+                user_id__in={user_id for user_id, _, _ in batch},
+                recipe_id__in={recipe_id for _, recipe_id, _ in batch},
+            ).values_list('user_id', 'recipe_id'))
+        fresh = [row for row in batch if row[:2] not in counted]
+        RankingEvent.objects.bulk_create(
+            [RankingEvent(user_id=user_id, recipe_id=recipe_id, kind=kind)
+             for user_id, recipe_id, _ in fresh],
+            ignore_conflicts=True,
+        )
+        yield from fresh
+
+
+class Command(BaseCommand):
+    help = (
+        'Incrementally refresh the trending ranking from favorites and '
+        'shopping cart additions made since the previous run'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Drop the ranking and rebuild it from all events',
+        )
+
+    def handle(self, *args, **kwargs):
+        until = timezone.now() - REFRESH_LAG
+        with transaction.atomic():
+            if kwargs['full']:
+                RecipeRanking.objects.all().delete()
+                RankingEvent.objects.all().delete()
+            since = RecipeRanking.objects.aggregate(
+                last=Max('last_event'))['last']
+
+            # свёртка новых событий по рецептам: память и время
+            # пропорциональны свежей активности, а не размеру таблиц
+            scores, last_events, events = {}, defaultdict(lambda: EPOCH), 0
+            for model, weight in WEIGHTS:
+                rows = model.objects.filter(created__lte=until)
+                if since is not None:
+                    rows = rows.filter(created__gt=since)
+                rows = rows.values_list('user_id', 'recipe_id', 'created')
+                for _, recipe_id, created in first_events(
+                        model, rows.iterator(chunk_size=BATCH_SIZE)):
+                    scores[recipe_id] = log_add(
+                        scores.get(recipe_id), log_weight(weight, created))
+                    last_events[recipe_id] = max(last_events[recipe_id],
+                                                 created)
+                    events += 1
+
+            existing = RecipeRanking.objects.in_bulk(list(scores))
+            RecipeRanking.objects.bulk_create(
+                [
+                    RecipeRanking(
+                        recipe_id=recipe_id,
+                        trending_score=log_add(
+                            getattr(existing.get(recipe_id),
+                                    'trending_score', None),
+                            score,
+                        ),
+                        last_event=last_events[recipe_id],
+                    )
+                    for recipe_id, score in scores.items()
+                ],
+                batch_size=BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=('recipe',),
+                update_fields=('trending_score', 'last_event'),
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {events} events, updated {len(scores)} recipes'))
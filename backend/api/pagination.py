@@ -1,4 +1,70 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from functools import partial
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connection
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from recipes.cache import get_versions
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+COUNT_KEY = 'count:{}'
+COUNT_TIMEOUT = 60                  # страховка от пропущенной инвалидации
+APPROXIMATE_COUNT_THRESHOLD = 100_000
+# ─────────────────────────────────────────────────────────────────────
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """
+    Django-пагинатор, который не пересчитывает COUNT(*) на каждой странице.
+
+    • count_key — count берётся из кэша (ключ включает версии данных);
+    • estimate — для запроса без фильтров и большой таблицы count берётся
+      из статистики планировщика Postgres (pg_class.reltuples); оценка
+      кэшируется под тем же count_key, что и точный count.
+    """
+
+    def __init__(self, *args, count_key=None, estimate=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+        self.estimate = estimate
+        self.count_is_approximate = False
+
+    def _estimated_count(self):
+        queryset = self.object_list
+        if (not self.estimate or connection.vendor != 'postgresql'
+                or queryset.query.where):
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= APPROXIMATE_COUNT_THRESHOLD:
+            return row[0]
+        return None
+
+    def _count(self):
+        estimated = self._estimated_count()
+        if estimated is not None:
+            return estimated, True
+        return super().count, False
+
+    @cached_property
+    def count(self):
+        # в кэше и точный count, и оценка: попадание не стоит ни запроса
+        cached = cache.get(self.count_key) if self.count_key else None
+        if cached is None:
+            cached = self._count()
+            if self.count_key:
+                cache.set(self.count_key, cached, COUNT_TIMEOUT)
+        count, self.count_is_approximate = cached
+        return count
 
 
 class PageLimitPagination(PageNumberPagination):
@@ -6,3 +72,67 @@ class PageLimitPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'limit'
     max_page_size = 100
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset-пагинация по id: ни COUNT(*), ни OFFSET."""
+
+    ordering = ('-id',)
+    page_size = PageLimitPagination.page_size
+    page_size_query_param = PageLimitPagination.page_size_query_param
+    max_page_size = PageLimitPagination.max_page_size
+
+
+class PageOrCursorPagination(PageLimitPagination):
+    """
+    По умолчанию — привычные page/limit.
+    С параметром ?cursor= (можно пустым для первой страницы) — курсор
+    по id: глубокие страницы стоят столько же, сколько первая.
+
+    Если вьюха определяет get_count_versions(), count кэшируется по
+    набору фильтров, пользователю и этим версиям данных.
+    """
+
+    cursor_query_param = IdCursorPagination.cursor_query_param
+
+    def _count_key(self, request, view):
+        get_count_versions = getattr(view, 'get_count_versions', None)
+        versions = get_count_versions() if get_count_versions else None
+        if versions is None:
+            return None
+        ignored = (self.page_query_param, self.page_size_query_param)
+        filters = urlencode(sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            if name not in ignored
+            for value in values
+        ))
+        raw = '|'.join((
+            request.path, str(request.user.pk), filters,
+            *get_versions(*versions),
+        ))
+        return COUNT_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        # курсор ключуется по id, для других сортировок — обычные страницы
+        if (self.cursor_query_param in request.query_params
+                and queryset.query.order_by == IdCursorPagination.ordering):
+            self.cursor_paginator = IdCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        # DRF создаёт пагинатор как django_paginator_class(queryset, size)
+        self.django_paginator_class = partial(
+            CachedCountPaginator,
+            count_key=self._count_key(request, view),
+            estimate=getattr(view, 'estimate_count', False),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        response = super().get_paginated_response(data)
+        if self.page.paginator.count_is_approximate:
+            response.data['count_is_approximate'] = True
+        return response
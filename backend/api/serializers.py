@@ -1,8 +1,13 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from django.db import transaction
+from recipes.cache import (
+    RECIPE_VERSION, bump_cart_versions, bump_version_on_commit,
+)
+from recipes.renditions import rendition_urls
+from recipes.search import update_search_fields
+from recipes.uploads import ImageUploadError, process_upload
 from recipes.models import (
     Ingredient, Recipe, RecipeIngredient,
     Favorite, ShoppingCart,
@@ -16,9 +21,70 @@ MAX_AMOUNT = 32_000
 
 MIN_TIME = 1            # для времени приготовления (мин)
 MAX_TIME = 32_000
+
+MAX_BULK_RECIPES = 100  # id в одном пакетном запросе
 # ─────────────────────────────────────────────────────────────────────
 
 
+def get_subscribed_ids(request):
+    """
+    Множество id авторов, на которых подписан текущий пользователь.
+    Загружается одним запросом и живёт до конца HTTP-запроса, поэтому
+    is_subscribed не зависит от размера страницы.
+    """
+    if not request or request.user.is_anonymous:
+        return frozenset()
+    ids = getattr(request, '_subscribed_ids', None)
+    if ids is None:
+        ids = frozenset(
+            request.user.subscriptions.values_list('author_id', flat=True)
+        )
+        request._subscribed_ids = ids
+    return ids
+
+
+class UploadedImageField(serializers.ImageField):
+    """
+    Картинка в base64. Декодирование, проверки и перекодирование —
+    в recipes.uploads, общем с /users/me/avatar/.
+    """
+
+    def to_internal_value(self, data):
+        try:
+            return process_upload(data)
+        except ImageUploadError as exc:
+            raise serializers.ValidationError(str(exc))
+
+
+class RenditionsMixin:
+    """
+    Добавляет `<поле>_renditions` со ссылками на превью, только если
+    клиент попросил ?renditions=1: схемы ответов API закрыты
+    (additionalProperties: false), лишний ключ по умолчанию их ломает.
+    """
+    renditions_source = 'image'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request and request.query_params.get('renditions') == '1':
+            fields[f'{self.renditions_source}_renditions'] = (
+                serializers.SerializerMethodField(
+                    method_name='get_renditions'))
+        return fields
+
+    def get_renditions(self, obj):
+        fieldfile = getattr(obj, self.renditions_source)
+        if not fieldfile:
+            return None
+        request = self.context['request']
+        return {
+            size: {fmt: request.build_absolute_uri(url)
+                   for fmt, url in formats.items()}
+            for size, formats in rendition_urls(fieldfile).items()
+        }
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     """Регистрация нового пользователя — без is_subscribed и avatar."""
     password = serializers.CharField(write_only=True)
@@ -38,7 +104,8 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return User.objects.create_user(**validated_data)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(RenditionsMixin, serializers.ModelSerializer):
+    renditions_source = 'avatar'
     avatar = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
@@ -57,19 +124,14 @@ class UserSerializer(serializers.ModelSerializer):
         return request.build_absolute_uri(obj.avatar.url) if request else obj.avatar.url
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        # читаем через related_name — subscriptions
-        return request.user.subscriptions.filter(author=obj).exists()
+        return obj.id in get_subscribed_ids(self.context.get('request'))
 
 
 class SubscribeActionSerializer(serializers.Serializer):
     """
     Пустой технический сериализатор.
-    Проверяет:
-      • нельзя подписаться на себя,
-      • нельзя подписаться повторно.
+    Проверяет, что пользователь не подписывается на себя; повторную
+    подписку отсекает уникальный индекс при вставке.
     """
 
     def validate(self, attrs):
@@ -79,16 +141,57 @@ class SubscribeActionSerializer(serializers.Serializer):
         if request.user == author:
             raise serializers.ValidationError('Нельзя подписаться на себя')
 
-        if request.user.subscriptions.filter(author=author).exists():
-            raise serializers.ValidationError('Уже подписаны')
-
         return attrs
 
 
+class RecipesLimitSerializer(serializers.Serializer):
+    """Проверяет квери-параметр recipes_limit: мусор → 400, а не 500."""
+    recipes_limit = serializers.IntegerField(min_value=0, required=False)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Тело пакетных запросов избранного / корзины: {"recipes": [id, …]}."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_RECIPES,
+    )
+
+    def validate_recipes(self, value):
+        # повторы убираем, порядок ответа — как в запросе
+        return list(dict.fromkeys(value))
+
+
+class CommaSeparatedListField(serializers.ListField):
+    """Квери-параметр списком: повтором (?a=1&a=2) или через запятую."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [data]
+        return super().to_internal_value([
+            value.strip() for raw in data
+            for value in str(raw).split(',') if value.strip()
+        ])
+
+
+class IngredientFilterSerializer(serializers.Serializer):
+    """Квери-параметры фильтра по ингредиентам: списки id."""
+    ingredients = CommaSeparatedListField(
+        child=serializers.IntegerField(min_value=1), required=False)
+    any_ingredients = CommaSeparatedListField(
+        child=serializers.IntegerField(min_value=1), required=False)
+    exclude_ingredients = CommaSeparatedListField(
+        child=serializers.IntegerField(min_value=1), required=False)
+
+
 class SubscriptionSerializer(UserSerializer):
+    """
+    Автор в подписках. Ожидает, что вьюсет заранее подгрузил
+    limited_recipes (Prefetch со срезом); для «голого» объекта
+    выбирает рецепты сам. recipes_count — денормализованная колонка.
+    """
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        source='recipes.count', read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -98,11 +201,14 @@ class SubscriptionSerializer(UserSerializer):
         )
 
     def get_recipes(self, author):
-        limit = self.context['request'].query_params.get('recipes_limit')
-        qs = author.recipes.all().order_by('-id')
-        if limit:
-            qs = qs[: int(limit)]
-        return RecipeShortSerializer(qs, many=True, context=self.context).data
+        recipes = getattr(author, 'limited_recipes', None)
+        if recipes is None:
+            limit = self.context.get('recipes_limit')
+            recipes = author.recipes.all().order_by('-id')
+            if limit is not None:
+                recipes = recipes[:limit]
+        return RecipeShortSerializer(
+            recipes, many=True, context=self.context).data
 
 
 # ---------- INGREDIENTS ---------- #
@@ -116,8 +222,10 @@ class IngredientSerializer(serializers.ModelSerializer):
 class IngredientAmountSerializer(serializers.ModelSerializer):
     """
     Объект: «ингредиент + количество» для записи рецепта.
+    Существование id проверяет RecipeWriteSerializer — одним запросом
+    на весь список.
     """
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         min_value=MIN_AMOUNT,
         max_value=MAX_AMOUNT,
@@ -145,7 +253,7 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeShortSerializer(serializers.ModelSerializer):
+class RecipeShortSerializer(RenditionsMixin, serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
 
     class Meta:
@@ -159,8 +267,8 @@ class RecipeShortSerializer(serializers.ModelSerializer):
         return request.build_absolute_uri(obj.image.url)
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
-    author = serializers.SerializerMethodField()
+class RecipeReadSerializer(RenditionsMixin, serializers.ModelSerializer):
+    author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientReadSerializer(
         source='recipe_ingredients', many=True, read_only=True
     )
@@ -176,26 +284,28 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     # ── Вспомогательные ──────────────────────────────────────────
-    def get_author(self, obj):
-        return UserSerializer(obj.author, context=self.context).data
-
-    def _relation(self, model, obj):
+    def _relation(self, model, obj, attr):
+        # RecipeViewSet.get_queryset аннотирует флаги через Exists();
+        # запрос делаем только для одиночных объектов (create / update)
+        annotated = getattr(obj, attr, None)
+        if annotated is not None:
+            return annotated
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
         return model.objects.filter(user=request.user, recipe=obj).exists()
 
     def get_is_favorited(self, obj):
-        return self._relation(Favorite, obj)
+        return self._relation(Favorite, obj, 'is_favorited')
 
     def get_is_in_shopping_cart(self, obj):
-        return self._relation(ShoppingCart, obj)
+        return self._relation(ShoppingCart, obj, 'is_in_shopping_cart')
 
 
 # ---------- РЕЦЕПТЫ (создание / изменение) ---------- #
 class RecipeWriteSerializer(serializers.ModelSerializer):
     ingredients = IngredientAmountSerializer(many=True)
-    image = Base64ImageField(required=True)
+    image = UploadedImageField(required=True)
     cooking_time = serializers.IntegerField(
         min_value=MIN_TIME,
         max_value=MAX_TIME,
@@ -213,9 +323,19 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     def validate_ingredients(self, value):
         if not value:
             raise serializers.ValidationError('Нужен хотя бы один ингредиент.')
-        ids = [item['id'].id for item in value]
+        ids = [item['id'] for item in value]
         if len(ids) != len(set(ids)):
             raise serializers.ValidationError('Ингредиенты повторяются.')
+        found = set(Ingredient.objects.filter(id__in=ids)
+                    .values_list('id', flat=True))
+        if len(found) != len(ids):
+            message = (serializers.PrimaryKeyRelatedField
+                       .default_error_messages['does_not_exist'])
+            raise serializers.ValidationError([
+                {} if pk in found
+                else {'id': [message.format(pk_value=pk)]}
+                for pk in ids
+            ])
         return value
 
     def validate_image(self, img):
@@ -241,12 +361,48 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         RecipeIngredient.objects.bulk_create([
             RecipeIngredient(
                 recipe=recipe,
-                ingredient=item['id'],
+                ingredient_id=item['id'],
                 amount=item['amount'],
             )
             for item in ingredients
         ])
 
+    def _update_ingredients(self, recipe, ingredients):
+        """
+        Сверяет присланный состав с текущим и трогает только отличия.
+        Порядок ингредиентов — порядок id строк, поэтому строки до первого
+        расхождения с порядком запроса остаются (меняется лишь количество),
+        а хвост с первого переставленного или нового ингредиента
+        пересоздаётся. Удаление и добавление в конец ничего не пересоздают.
+        Возвращает True, если состав или порядок изменились.
+        """
+        rows = list(recipe.recipe_ingredients.only(
+            'id', 'ingredient_id', 'amount'))
+        wanted_ids = {item['id'] for item in ingredients}
+        kept = [row for row in rows if row.ingredient_id in wanted_ids]
+        prefix = 0
+        for row, item in zip(kept, ingredients):
+            if row.ingredient_id != item['id']:
+                break
+            prefix += 1
+
+        kept, changed = kept[:prefix], []
+        for row, item in zip(kept, ingredients):
+            if row.amount != item['amount']:
+                row.amount = item['amount']
+                changed.append(row)
+        kept_pks = {row.pk for row in kept}
+        removed = [row.pk for row in rows if row.pk not in kept_pks]
+        added = ingredients[prefix:]
+
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        if added:
+            self._set_ingredients(recipe, added)
+        return bool(removed or changed or added)
+
     @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
@@ -255,19 +411,34 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             **validated_data,
         )
         self._set_ingredients(recipe, ingredients)
+        update_search_fields(Recipe.objects.filter(pk=recipe.pk))
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients', None)
-        # остальные поля
+        text_changed = any(
+            getattr(instance, attr) != validated_data[attr]
+            for attr in ('name', 'text') if attr in validated_data
+        )
+        # остальные поля; пишем только их — полный save() вернул бы
+        # в строку счётчики, прочитанные до долгой обработки картинки
         for attr, val in validated_data.items():
             setattr(instance, attr, val)
-        instance.save()
+        instance.save(update_fields=list(validated_data))
 
-        if ingredients is not None:
-            instance.recipe_ingredients.all().delete()
-            self._set_ingredients(instance, ingredients)
+        ingredients_changed = (
+            ingredients is not None
+            and self._update_ingredients(instance, ingredients)
+        )
+        if ingredients_changed:
+            # списки покупок с этим рецептом надо пересобрать; карточку —
+            # тоже: без изменённых полей save() сигнала не шлёт
+            bump_cart_versions(
+                instance.in_carts.values_list('user_id', flat=True))
+            bump_version_on_commit(RECIPE_VERSION.format(instance.pk))
+        if text_changed or ingredients_changed:
+            update_search_fields(Recipe.objects.filter(pk=instance.pk))
         return instance
 
     def to_representation(self, instance):
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.cache import INGREDIENTS_VERSION, get_version
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class CacheInvalidationTest(TestCase):
+    """
+    Кэши сбрасываются при любом пути записи — не только через API, но и
+    через ORM (админка, shell), и только после коммита.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='pass')
+        self.salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', text='Текст', cooking_time=5)
+        self.row = RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=self.salt, amount=5)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def shopping_list(self):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'format': 'csv'})
+        return b''.join(response.streaming_content).decode()
+
+    def test_shopping_list_after_admin_edit(self):
+        self.assertIn('соль,г,5', self.shopping_list())
+        # changeform: рецепт сохраняется целиком, инлайн — следом
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+            self.row.amount = 7
+            self.row.save()
+        self.assertIn('соль,г,7', self.shopping_list())
+
+    def test_shopping_list_after_cart_row_deleted(self):
+        self.assertIn('соль', self.shopping_list())
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingCart.objects.filter(user=self.user).delete()
+        self.assertNotIn('соль', self.shopping_list())
+
+    def test_ingredients_version_after_commit(self):
+        version = get_version(INGREDIENTS_VERSION)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.salt.name = 'соль морская'
+            self.salt.save()
+            # до коммита справочник в кэше ещё верен для чужих запросов
+            self.assertEqual(get_version(INGREDIENTS_VERSION), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version(INGREDIENTS_VERSION), version)
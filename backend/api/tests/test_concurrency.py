@@ -0,0 +1,110 @@
+import threading
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+THREADS = 16
+ROUNDS = 3
+# ─────────────────────────────────────────────────────────────────────
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class ToggleConcurrencyTest(TransactionTestCase):
+    """
+    Много одновременных одинаковых запросов на одну пару
+    (пользователь, рецепт / автор): ровно один успешен, остальные — 400,
+    ни одного 500, счётчики сходятся. Повтор ловит уникальный индекс
+    (recipes.links.insert_ignore), а не SELECT перед вставкой; второй
+    DELETE ждёт блокировку строки и счётчик повторно не уменьшает.
+
+    У каждого счётчика есть и чужая строка: он не опускается до нуля,
+    и Greatest(…, 0) не скрыл бы двойной декремент.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='pass')
+        self.author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass')
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Текст', cooking_time=5)
+        self.other = User.objects.create_user(
+            email='other@example.com', username='other', password='pass')
+        Favorite.objects.create(user=self.other, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.other, recipe=self.recipe)
+        Subscription.objects.create(user=self.other, author=self.author)
+        Subscription.objects.create(user=self.user, author=self.other)
+
+    def hammer(self, method, url):
+        """THREADS потоков шлют один и тот же запрос одновременно."""
+        codes, lock = Counter(), threading.Lock()
+        barrier = threading.Barrier(THREADS)
+
+        def worker():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            barrier.wait()
+            try:
+                code = getattr(client, method)(url).status_code
+            except Exception as exc:
+                code = type(exc).__name__
+            finally:
+                connection.close()
+            with lock:
+                codes[code] += 1
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return codes
+
+    def assertToggles(self, url, rows, counters):
+        """
+        rows — строки пары; counters — (объект, поле) её счётчиков,
+        у каждого из которых есть ещё одна, чужая строка.
+        """
+        for _ in range(ROUNDS):
+            for method, success, expected in (('post', 201, 1),
+                                              ('delete', 204, 0)):
+                codes = self.hammer(method, url)
+                self.assertEqual(
+                    codes, Counter({success: 1, 400: THREADS - 1}))
+                self.assertEqual(rows.count(), expected)
+                for obj, field in counters:
+                    obj.refresh_from_db()
+                    self.assertEqual(getattr(obj, field), expected + 1)
+
+    def test_favorite(self):
+        self.assertToggles(
+            f'/api/recipes/{self.recipe.pk}/favorite/',
+            Favorite.objects.filter(user=self.user, recipe=self.recipe),
+            ((self.recipe, 'favorites_count'),),
+        )
+
+    def test_shopping_cart(self):
+        self.assertToggles(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/',
+            ShoppingCart.objects.filter(user=self.user, recipe=self.recipe),
+            ((self.recipe, 'carts_count'),),
+        )
+
+    def test_subscribe(self):
+        self.assertToggles(
+            f'/api/users/{self.author.pk}/subscribe/',
+            Subscription.objects.filter(user=self.user, author=self.author),
+            ((self.author, 'followers_count'),
+             (self.user, 'subscriptions_count')),
+        )
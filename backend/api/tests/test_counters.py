@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from api.serializers import RecipeWriteSerializer
+from recipes.counters import batched_counters
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    """
+    Денормализованные счётчики верны при любом пути записи, а не только
+    через API: ORM (админка, shell) и каскадное удаление.
+    """
+
+    def setUp(self):
+        self.author, self.reader, self.other = (
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name, password='pass')
+            for name in ('author', 'reader', 'other'))
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Текст', cooking_time=5,
+            image='recipes/images/test.png')
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        self.assertEqual(
+            {field: getattr(obj, field) for field in expected}, expected)
+
+    def test_orm_writes(self):
+        self.assertCounters(self.author, recipes_count=1)
+        favorite = Favorite.objects.create(
+            user=self.reader, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        Subscription.objects.create(user=self.reader, author=self.author)
+        self.assertCounters(self.recipe, favorites_count=1, carts_count=1)
+        self.assertCounters(self.author, followers_count=1)
+        self.assertCounters(self.reader, subscriptions_count=1)
+
+        # перенос строки на другой FK (правка в админке)
+        other_recipe = Recipe.objects.create(
+            author=self.other, name='Другой', text='Текст', cooking_time=5,
+            image='recipes/images/test.png')
+        favorite.recipe = other_recipe
+        favorite.save()
+        self.assertCounters(self.recipe, favorites_count=0)
+        self.assertCounters(other_recipe, favorites_count=1)
+
+        Favorite.objects.all().delete()
+        Subscription.objects.all().delete()
+        self.assertCounters(other_recipe, favorites_count=0)
+        self.assertCounters(self.author, followers_count=0)
+        self.assertCounters(self.reader, subscriptions_count=0)
+
+    def test_edit_keeps_concurrent_counts(self):
+        # экземпляр прочитан до того, как параллельный запрос добавил
+        # рецепт в избранное, — правка не должна вернуть старый счётчик
+        ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г')
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        serializer = RecipeWriteSerializer(recipe, partial=True, data={
+            'name': 'Новое название',
+            'ingredients': [{'id': ingredient.pk, 'amount': 5}],
+        })
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertCounters(self.recipe, favorites_count=1)
+
+    def test_user_delete_cascade(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        Subscription.objects.create(user=self.reader, author=self.author)
+        Subscription.objects.create(user=self.author, author=self.other)
+        self.reader.delete()
+        self.assertCounters(self.recipe, favorites_count=0, carts_count=0)
+        self.assertCounters(self.author, followers_count=0,
+                            subscriptions_count=1)
+        self.author.delete()
+        self.assertCounters(self.other, followers_count=0)
+
+    def test_batched(self):
+        readers = User.objects.bulk_create(
+            User(email=f'r{i}@example.com', username=f'r{i}')
+            for i in range(20))
+        Favorite.objects.bulk_create(
+            Favorite(user=user, recipe=self.recipe) for user in readers)
+        self.recipe.favorites_count = 20
+        self.recipe.save(update_fields=('favorites_count',))
+        # выборка, DELETE и один UPDATE счётчика вместо двадцати
+        with self.assertNumQueries(3), batched_counters():
+            Favorite.objects.filter(recipe=self.recipe).delete()
+        self.assertCounters(self.recipe, favorites_count=0)
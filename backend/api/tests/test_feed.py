@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class FeedFanOutTest(TestCase):
+    """Рецепт попадает в ленты подписчиков при любом пути создания."""
+
+    def setUp(self):
+        cache.clear()
+        self.author, self.reader = (
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name, password='pass')
+            for name in ('author', 'reader'))
+        Subscription.objects.create(user=self.reader, author=self.author)
+
+    def test_recipe_created_through_orm(self):
+        # так создаёт рецепт админка
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author, name='Рецепт', text='Текст',
+                cooking_time=5)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, recipe=recipe).exists())
+
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        results = client.get('/api/recipes/feed/').json()['results']
+        self.assertEqual([item['id'] for item in results], [recipe.pk])
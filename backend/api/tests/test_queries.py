@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+RECIPES_COUNT = 12
+PAGE_SIZE = 10
+LIST_QUERIES = 5        # страница рецептов — не зависит от её размера
+DETAIL_QUERIES = 3
+# ─────────────────────────────────────────────────────────────────────
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class RecipeQueriesTest(TestCase):
+    """
+    Число запросов к БД при чтении рецептов не должно расти вместе с
+    числом рецептов на странице и ингредиентов в рецепте (N+1).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass',
+            first_name='Автор', last_name='Авторов')
+        cls.reader = User.objects.create_user(
+            email='reader@example.com', username='reader', password='pass',
+            first_name='Читатель', last_name='Читателев')
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+            for i in range(3))
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=cls.author, name=f'Рецепт {i}', text='Текст',
+                   cooking_time=10, image='recipes/images/test.png')
+            for i in range(RECIPES_COUNT))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=5)
+            for recipe in recipes
+            for ingredient in ingredients)
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.reader, recipe=recipe) for recipe in recipes)
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.reader, recipe=recipe)
+            for recipe in recipes[::2])
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+        cls.recipe = recipes[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_list_page(self):
+        with self.assertNumQueries(LIST_QUERIES):
+            response = self.client.get(
+                '/api/recipes/', {'limit': PAGE_SIZE})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), PAGE_SIZE)
+        self.assertTrue(all(len(item['ingredients']) == 3
+                            for item in results))
+
+    def test_list_page_cached_count(self):
+        self.client.get('/api/recipes/', {'limit': PAGE_SIZE})
+        # count (и его оценка) уже в кэше — остаются страница и её данные
+        with self.assertNumQueries(LIST_QUERIES - 2):
+            self.client.get('/api/recipes/', {'limit': PAGE_SIZE, 'page': 2})
+
+    def test_detail(self):
+        with self.assertNumQueries(DETAIL_QUERIES):
+            response = self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['is_favorited'])
+        self.assertTrue(data['author']['is_subscribed'])
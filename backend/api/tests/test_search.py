@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.search import update_search_fields
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class SearchFieldsTest(TestCase):
+    """Поисковые поля рецептов следуют за справочником ингредиентов."""
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass')
+        self.salt, self.pepper = Ingredient.objects.bulk_create((
+            Ingredient(name='соль', measurement_unit='г'),
+            Ingredient(name='перец', measurement_unit='г'),
+        ))
+        self.recipe = Recipe.objects.create(
+            author=author, name='Суп', text='Текст', cooking_time=5)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=self.recipe, ingredient=ingredient,
+                             amount=5)
+            for ingredient in (self.salt, self.pepper))
+        update_search_fields(Recipe.objects.filter(pk=self.recipe.pk))
+        self.client = APIClient()
+
+    def found(self, **params):
+        response = self.client.get('/api/recipes/', params)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_ingredient_deleted(self):
+        self.assertEqual(self.found(search='соль'), [self.recipe.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.delete()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.ingredient_ids, [self.pepper.pk])
+        self.assertEqual(self.found(search='соль'), [])
+        self.assertEqual(self.found(search='перец'), [self.recipe.pk])
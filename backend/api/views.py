@@ -3,36 +3,84 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.shortcuts import get_object_or_404
-from django.core.files.base import ContentFile
-import base64
-import uuid
-import imghdr
+from django.shortcuts import get_object_or_404, redirect
+from io import SEEK_END, BytesIO
 from api.permissions import IsAuthorOrReadOnly
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from api.serializers import (
-    SubscriptionSerializer,
+    RecipeIdsSerializer, RecipesLimitSerializer, SubscriptionSerializer,
     SubscribeActionSerializer,
-    IngredientSerializer, RecipeReadSerializer,
+    IngredientSerializer, IngredientFilterSerializer, RecipeReadSerializer,
     RecipeWriteSerializer, RecipeShortSerializer,
 )
-from django.db.models import Sum
-from django.http import FileResponse
-from django.utils.crypto import get_random_string
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Sum
+from django.core.cache import cache
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from api.pagination import PageOrCursorPagination
+from api.renderers import (
+    CSVRenderer, JSONExportRenderer, PDFRenderer, PlainTextRenderer,
+)
+from recipes.models import (
+    Ingredient, Recipe, RecipeIngredient, Favorite, ShoppingCart,
+)
+from recipes import shortlinks
+from recipes.cache import (
+    CART_VERSION, FAVORITES_VERSION, INGREDIENTS_VERSION, RECIPE_VERSION,
+    RECIPES_VERSION, SUBSCRIPTIONS_VERSION, USER_VERSION,
+    bump_version_on_commit, get_version, get_versions,
+)
+from recipes.counters import batched_counters
+from recipes.feed import backfill_feed, feed_recipes, trim_feed
+from recipes.ingredient_index import ingredient_index
+from recipes.links import bulk_insert_ignore, insert_ignore
+from recipes.search import filter_by_ingredients, search_recipes
+from recipes.uploads import ImageUploadError, process_upload
+from recipes.utils import (
+    iter_csv_shopping_cart, iter_json_shopping_cart, iter_text_shopping_cart,
+    render_pdf_shopping_cart,
+)
+from users.models import Subscription
 
-from api.pagination import PageLimitPagination
-from recipes.models import Ingredient, Recipe, Favorite, ShoppingCart
-from recipes.utils import render_pdf_shopping_cart
+# ?ordering= для ленты: popular — по денормализованным счётчикам
+# (recipe_popularity_idx), trending — по сводной таблице RecipeRanking
+RECIPE_ORDERINGS = {
+    'popular': ((F('favorites_count') + F('carts_count')).desc(), '-id'),
+    'trending': (F('ranking__trending_score').desc(nulls_last=True), '-id'),
+}
 
-__all__ = ['CustomUserViewSet', 'IngredientViewSet', 'RecipeViewSet']
+__all__ = [
+    'CustomUserViewSet', 'IngredientViewSet', 'RecipeViewSet',
+    'short_link_redirect',
+]
 
-SHORT_CODE_LENGTH = 3
 SHORT_LINK_PATH = '/recipes/s/'
+RECIPE_PAGE_PATH = '/recipes/'
+INGREDIENTS_LIST_KEY = 'ingredients:list:{}'
+INGREDIENTS_LIST_TIMEOUT = 60 * 60 * 24
+RECIPE_DETAIL_KEY = 'recipe:detail:{}:{}:{}:{}:{}'
+RECIPE_DETAIL_TIMEOUT = 60 * 60 * 24
+SHOPPING_CART_KEY = 'shopping_cart:{}:{}:{}:{}'
+SHOPPING_CART_TIMEOUT = 60 * 60 * 24
+SHOPPING_CART_CACHE_MAX_SIZE = 512 * 1024
+SHOPPING_CART_WRITERS = {
+    PlainTextRenderer.format: iter_text_shopping_cart,
+    CSVRenderer.format: iter_csv_shopping_cart,
+    JSONExportRenderer.format: iter_json_shopping_cart,
+}
 
 
 class CustomUserViewSet(DjoserUserViewSet):
@@ -43,12 +91,46 @@ class CustomUserViewSet(DjoserUserViewSet):
         • /api/users/me/avatar/
     """
     lookup_value_regex = r'\d+'
+    pagination_class = PageOrCursorPagination
 
     # ---------- /me ----------------------------------------------------
     @action(detail=False, methods=('get',), permission_classes=(IsAuthenticated,))
     def me(self, request, *args, **kwargs):
         return super().me(request, *args, **kwargs)
 
+    # ---------- подписки: общий queryset ------------------------------
+    def _recipes_limit(self):
+        params = RecipesLimitSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data.get('recipes_limit')
+
+    def _with_recipes(self, authors, limit):
+        """
+        Первые `limit` рецептов всех авторов страницы — одним запросом
+        (Prefetch со срезом → ROW_NUMBER()); recipes_count — колонка.
+        """
+        recipes = Recipe.objects.order_by('-id')
+        if limit is not None:
+            recipes = recipes[:limit]
+        return authors.prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+
+    def get_count_versions(self):
+        if self.action == 'subscriptions':
+            return (SUBSCRIPTIONS_VERSION.format(self.request.user.pk),)
+        return None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('subscribe', 'subscriptions'):
+            context['recipes_limit'] = self._recipes_limit()
+        return context
+
+    def _subscriptions_changed(self, user):
+        # счётчики подписок двигают сигналы (recipes.signals)
+        bump_version_on_commit(SUBSCRIPTIONS_VERSION.format(user.pk))
+
     # ---------- /subscribe --------------------------------------------
     @action(detail=True, methods=('post', 'delete'),
             permission_classes=(IsAuthenticated,), url_path='subscribe')
@@ -56,32 +138,47 @@ class CustomUserViewSet(DjoserUserViewSet):
         author = get_object_or_404(self.get_queryset(), pk=id)
 
         if request.method == 'POST':
+            context = self.get_serializer_context()
             SubscribeActionSerializer(
                 data={}, context={'request': request, 'author': author}
             ).is_valid(raise_exception=True)
 
-            request.user.subscriptions.create(author=author)
-
-            data = SubscriptionSerializer(
-                author, context=self.get_serializer_context()
-            ).data
+            # повтор ловит уникальный индекс (user, author), а не SELECT
+            if not insert_ignore(Subscription, user=request.user,
+                                 author=author):
+                raise ValidationError(
+                    {api_settings.NON_FIELD_ERRORS_KEY: ['Уже подписаны']})
+            self._subscriptions_changed(request.user)
+            backfill_feed(request.user, author)
+
+            author = self._with_recipes(
+                self.get_queryset().filter(pk=author.pk),
+                context['recipes_limit'],
+            ).get()
+            data = SubscriptionSerializer(author, context=context).data
             return Response(data, status=status.HTTP_201_CREATED)
 
-        # DELETE
-        deleted, _ = request.user.subscriptions.filter(author=author).delete()
-        if not deleted:
+        # DELETE: как в RecipeViewSet._toggle — под блокировкой строки
+        with transaction.atomic():
+            subscription = (request.user.subscriptions.select_for_update()
+                            .filter(author=author).first())
+            if subscription is not None:
+                subscription.delete()
+        if subscription is None:
             return Response({'errors': 'Подписки не существует'},
                             status=status.HTTP_400_BAD_REQUEST)
+        self._subscriptions_changed(request.user)
+        trim_feed(request.user, author)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     # ---------- /subscriptions ----------------------------------------
     @action(detail=False, methods=('get',), permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
+        context = self.get_serializer_context()
         authors = self.get_queryset().filter(subscribers__user=request.user)
-        page = self.paginate_queryset(authors.order_by('-id'))
-        serializer = SubscriptionSerializer(
-            page, many=True, context=self.get_serializer_context()
-        )
+        page = self.paginate_queryset(self._with_recipes(
+            authors.order_by('-id'), context['recipes_limit']))
+        serializer = SubscriptionSerializer(page, many=True, context=context)
         return self.get_paginated_response(serializer.data)
 
     # ---------- /me/avatar --------------------------------------------
@@ -97,27 +194,24 @@ class CustomUserViewSet(DjoserUserViewSet):
                                 status=status.HTTP_400_BAD_REQUEST)
 
             try:
-                if raw.startswith('data:image'):
-                    header, b64 = raw.split(';base64,')
-                    ext = header.split('/')[-1]
-                else:
-                    b64, ext = raw, 'png'
-
-                binary = base64.b64decode(b64)
-                ext = imghdr.what(None, binary) or ext
-                user.avatar.save(f'{uuid.uuid4()}.{ext}',
-                                 ContentFile(binary), save=True)
-            except Exception:
-                return Response({'errors': 'Некорректный формат изображения'},
+                image = process_upload(raw)
+            except ImageUploadError as exc:
+                return Response({'errors': str(exc)},
                                 status=status.HTTP_400_BAD_REQUEST)
+            # только аватар: полный save() затёр бы счётчики пользователя
+            # значениями, прочитанными до обработки картинки
+            user.avatar.save(image.name, image, save=False)
+            user.save(update_fields=('avatar',))
 
             return Response(
                 {'avatar': request.build_absolute_uri(user.avatar.url)},
                 status=status.HTTP_200_OK,
             )
 
-        # DELETE
-        user.avatar.delete(save=True)
+        # DELETE: сам файл (и превью) освобождает сигнал — если на тот же
+        # контент не ссылается кто-то ещё
+        user.avatar = None
+        user.save(update_fields=('avatar',))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -128,29 +222,101 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         name = self.request.query_params.get('name')
-        return (self.queryset
-                .filter(name__istartswith=name) if name else self.queryset)
+        queryset = self.queryset.all()
+        return queryset.filter(name__istartswith=name) if name else queryset
+
+    def list(self, request, *args, **kwargs):
+        # автодополнение бьёт сюда на каждое нажатие клавиши —
+        # отвечаем из индекса в памяти процесса, без запроса к БД
+        name = request.query_params.get('name')
+        if not name:
+            return self._full_list(request)
+        serializer = self.get_serializer(
+            ingredient_index.search(name), many=True)
+        return Response(serializer.data)
+
+    def _full_list(self, request):
+        """
+        Весь справочник: JSON рендерится один раз на версию таблицы и
+        лежит в кэше байтами; ETag = версия, поэтому повторы получают 304.
+        """
+        version = get_version(INGREDIENTS_VERSION)
+        etag = f'"ingredients-{version}"'
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in parse_etags(if_none_match) or if_none_match == '*':
+            response = HttpResponseNotModified()
+        else:
+            key = INGREDIENTS_LIST_KEY.format(version)
+            payload = cache.get(key)
+            if payload is None:
+                payload = JSONRenderer().render(
+                    self.get_serializer(self.get_queryset(), many=True).data
+                )
+                cache.set(key, payload, INGREDIENTS_LIST_TIMEOUT)
+            response = HttpResponse(payload, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.select_related(
-        'author').prefetch_related('ingredients')
-    pagination_class = PageLimitPagination
+    queryset = Recipe.objects.select_related('author').prefetch_related(
+        Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient'),
+        )
+    )
+    pagination_class = PageOrCursorPagination
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
+    estimate_count = True   # без фильтров count ленты можно оценить
+    lookup_value_regex = r'\d+'
 
     # ------------- фильтрация --------------------
     def get_queryset(self):
-        qs = (Recipe.objects.select_related('author')
-              .prefetch_related('ingredients', 'favorite_recipes', 'cart_recipes'))
+        # RecipeIngredientReadSerializer читает recipe_ingredients →
+        # ingredient, поэтому подгружаем именно их: один запрос на страницу
+        qs = self.queryset.all()
 
         params, user = self.request.query_params, self.request.user
+        if user.is_authenticated:
+            # флаги считаем подзапросами в том же SELECT, а не по запросу
+            # на каждый рецепт в сериализаторе
+            qs = qs.annotate(
+                is_favorited=Exists(Favorite.objects.filter(
+                    user=user, recipe=OuterRef('pk'))),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk'))),
+            )
         if author := params.get('author'):
             qs = qs.filter(author__id=author)
         if params.get('is_favorited') == '1' and user.is_authenticated:
-            qs = qs.filter(favorite_recipes=user)
+            qs = qs.filter(is_favorited=True)
         if params.get('is_in_shopping_cart') == '1' and user.is_authenticated:
-            qs = qs.filter(cart_recipes=user)
-        return qs.order_by('-id')
+            qs = qs.filter(is_in_shopping_cart=True)
+        filters = IngredientFilterSerializer(data=params)
+        filters.is_valid(raise_exception=True)
+        qs = filter_by_ingredients(
+            qs,
+            all_of=filters.validated_data.get('ingredients'),
+            any_of=filters.validated_data.get('any_ingredients'),
+            none_of=filters.validated_data.get('exclude_ingredients'),
+        )
+        ordering = ('-id',)
+        if search := params.get('search'):
+            qs = search_recipes(qs, search)
+            ordering = ('-rank', '-id')
+        return qs.order_by(
+            *RECIPE_ORDERINGS.get(params.get('ordering'), ordering))
+
+    def get_count_versions(self):
+        user_id = self.request.user.pk
+        if user_id is None:
+            return (RECIPES_VERSION,)
+        versions = (RECIPES_VERSION, FAVORITES_VERSION.format(user_id),
+                    CART_VERSION.format(user_id))
+        if self.action == 'feed':
+            versions += (SUBSCRIPTIONS_VERSION.format(user_id),)
+        return versions
 
     # ------------- сериалайзер -------------------
     def get_serializer_class(self):
@@ -158,6 +324,65 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 if self.request.method == 'GET'
                 else RecipeWriteSerializer)
 
+    # ------------- карточка рецепта --------------
+    def _detail_key(self, recipe_id):
+        # ссылки на картинки абсолютные — схема и хост входят в ключ
+        recipe_version, ingredients_version = get_versions(
+            RECIPE_VERSION.format(recipe_id), INGREDIENTS_VERSION)
+        return RECIPE_DETAIL_KEY.format(
+            recipe_id, self.request.build_absolute_uri('/'),
+            self.request.query_params.get('renditions') == '1',
+            recipe_version, ingredients_version,
+        )
+
+    def _with_flags(self, payload, recipe_id):
+        """Флаги текущего пользователя поверх общей части ответа."""
+        user = self.request.user
+        if user.is_anonymous:
+            return payload
+        flags = Recipe.objects.filter(pk=recipe_id).values_list(
+            Exists(Favorite.objects.filter(user=user, recipe=OuterRef('pk'))),
+            Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            Exists(user.subscriptions.filter(author=OuterRef('author'))),
+        ).first()
+        if flags is None:
+            raise Http404
+        favorited, in_cart, subscribed = flags
+        return {
+            **payload,
+            'is_favorited': favorited,
+            'is_in_shopping_cart': in_cart,
+            'author': {**payload['author'], 'is_subscribed': subscribed},
+        }
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Не зависящая от пользователя часть карточки кэшируется по версии
+        рецепта, справочника ингредиентов и профиля автора; флаги текущего
+        пользователя подставляются одним запросом.
+        """
+        recipe_id = int(self.kwargs['pk'])
+        key = self._detail_key(recipe_id)
+        entry = cache.get(key)
+        if entry is not None:
+            author_id, author_version, payload = entry
+            if get_version(USER_VERSION.format(author_id)) == author_version:
+                return Response(self._with_flags(payload, recipe_id))
+
+        recipe = self.get_object()
+        author_version = get_version(USER_VERSION.format(recipe.author_id))
+        data = self.get_serializer(recipe).data
+        shared = {
+            **data,
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'author': {**data['author'], 'is_subscribed': False},
+        }
+        cache.set(key, (recipe.author_id, author_version, shared),
+                  RECIPE_DETAIL_TIMEOUT)
+        return Response(data)
+
     # ------------- delete only author ------------
     def destroy(self, request, *args, **kwargs):
         recipe = self.get_object()
@@ -165,55 +390,214 @@ class RecipeViewSet(viewsets.ModelViewSet):
             raise PermissionDenied('Нельзя удалить чужой рецепт')
         return super().destroy(request, *args, **kwargs)
 
-    # ------------- избранное / корзина -----------
-    def _toggle(self, model, request, recipe):
-        link = model.objects.filter(user=request.user, recipe=recipe).first()
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        bump_version_on_commit(RECIPES_VERSION)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        # правка меняет выдачу ?search= и т. п. — сбрасываем кэш count
+        bump_version_on_commit(RECIPES_VERSION)
 
+    def perform_destroy(self, instance):
+        # каскад по избранному и корзинам — одним UPDATE на счётчик,
+        # версии их кэшей сбрасывают сигналы (recipes.signals)
+        with transaction.atomic(), batched_counters():
+            super().perform_destroy(instance)
+            # внутри транзакции: иначе on_commit сработает до DELETE
+            bump_version_on_commit(RECIPES_VERSION)
+
+    # ------------- избранное / корзина -----------
+    def _toggle(self, model, request, pk):
+        """
+        Одна запись на клик: вставка с ON CONFLICT DO NOTHING (повтор —
+        по числу вставленных строк) или DELETE заблокированной строки.
+        """
+        user = request.user
         if request.method == 'POST':
-            if link:
+            recipe = get_object_or_404(
+                Recipe.objects.only('id', 'name', 'image', 'cooking_time'),
+                pk=pk)
+            if not insert_ignore(model, user=user, recipe=recipe):
                 return Response({'errors': 'Уже добавлено'},
                                 status=status.HTTP_400_BAD_REQUEST)
-            model.objects.create(user=request.user, recipe=recipe)
             data = RecipeShortSerializer(
                 recipe, context={'request': request}).data
             return Response(data, status=status.HTTP_201_CREATED)
 
-        # DELETE
-        if not link:
+        # DELETE: строку блокируем — из двух параллельных DELETE второй
+        # дождётся коммита первого, не найдёт её и счётчик не тронет
+        with transaction.atomic():
+            link = (model.objects.select_for_update()
+                    .filter(user=user, recipe_id=pk).first())
+            if link is not None:
+                link.delete()
+        if link is None:
+            get_object_or_404(Recipe.objects.all(), pk=pk)
             return Response({'errors': 'Этого рецепта там нет'},
                             status=status.HTTP_400_BAD_REQUEST)
-        link.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=('post', 'delete'), permission_classes=(IsAuthenticated,))
     def favorite(self, request, pk=None):
-        return self._toggle(Favorite, request, self.get_object())
+        return self._toggle(Favorite, request, pk)
 
     @action(detail=True, methods=('post', 'delete'), permission_classes=(IsAuthenticated,))
     def shopping_cart(self, request, pk=None):
-        return self._toggle(ShoppingCart, request, self.get_object())
+        return self._toggle(ShoppingCart, request, pk)
+
+    # ------------- пакетные избранное / корзина --
+    def _bulk_toggle(self, model, request):
+        """
+        Список id за один запрос: одна вставка (ON CONFLICT DO NOTHING …
+        RETURNING) или один DELETE в транзакции, итог — по каждому id.
+        """
+        params = RecipeIdsSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        recipe_ids = params.validated_data['recipes']
+        user = request.user
+
+        with transaction.atomic(), batched_counters():
+            if request.method == 'POST':
+                found = set(Recipe.objects.filter(pk__in=recipe_ids)
+                            .values_list('pk', flat=True))
+                changed = bulk_insert_ignore(
+                    model,
+                    [model(user=user, recipe_id=recipe_id)
+                     for recipe_id in recipe_ids if recipe_id in found],
+                    returning='recipe',
+                )
+                done, skipped = 'added', 'exists'
+            else:
+                links = model.objects.filter(
+                    user=user, recipe_id__in=recipe_ids)
+                # блокируем строки: параллельный DELETE не посчитает их
+                # удалёнными второй раз
+                changed = set(links.select_for_update()
+                              .values_list('recipe_id', flat=True))
+                links.filter(recipe_id__in=changed).delete()
+                found = changed | set(
+                    Recipe.objects.filter(pk__in=set(recipe_ids) - changed)
+                    .values_list('pk', flat=True))
+                done, skipped = 'removed', 'missing'
+
+        return Response({'results': [
+            {'id': recipe_id,
+             'status': (done if recipe_id in changed
+                        else skipped if recipe_id in found
+                        else 'not_found')}
+            for recipe_id in recipe_ids
+        ]})
+
+    @action(detail=False, methods=('post', 'delete'),
+            url_path='favorite/bulk', url_name='favorite-bulk',
+            permission_classes=(IsAuthenticated,))
+    def favorite_bulk(self, request):
+        return self._bulk_toggle(Favorite, request)
+
+    @action(detail=False, methods=('post', 'delete'),
+            url_path='shopping_cart/bulk', url_name='shopping-cart-bulk',
+            permission_classes=(IsAuthenticated,))
+    def shopping_cart_bulk(self, request):
+        return self._bulk_toggle(ShoppingCart, request)
+
+    @action(detail=False, methods=('delete',),
+            url_path='shopping_cart', url_name='shopping-cart-clear',
+            permission_classes=(IsAuthenticated,))
+    def clear_shopping_cart(self, request):
+        """Очистить корзину целиком."""
+        with transaction.atomic(), batched_counters():
+            links = ShoppingCart.objects.filter(user=request.user)
+            recipe_ids = set(links.select_for_update()
+                             .values_list('recipe_id', flat=True))
+            links.filter(recipe_id__in=recipe_ids).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    # ------------- лента подписок ----------------
+    @action(detail=False, methods=('get',),
+            permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь; новые сверху."""
+        recipes = feed_recipes(self.get_queryset(), request.user)
+        page = self.paginate_queryset(recipes)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     # ------------- PDF список покупок ------------
-    @action(detail=False, methods=('get',), permission_classes=(IsAuthenticated,))
-    def download_shopping_cart(self, request):
-        rows = (Ingredient.objects
-                .filter(ingredient_recipes__recipe__cart_recipes=request.user)
-                .values('name', 'measurement_unit')
-                .annotate(total=Sum('ingredient_recipes__amount'))
-                .order_by('name'))
-        pdf = render_pdf_shopping_cart(
-            request.user,
-            [{'name': r['name'], 'unit': r['measurement_unit'], 'amount': r['total']}
-             for r in rows]
+    def _shopping_cart_key(self, user):
+        """Ключ кэша меняется вместе с корзиной и справочником ингредиентов."""
+        return SHOPPING_CART_KEY.format(
+            user.id, user.username,
+            get_version(CART_VERSION.format(user.id)),
+            get_version(INGREDIENTS_VERSION),
         )
-        return FileResponse(pdf, as_attachment=True,
-                            filename='shopping_list.pdf',
-                            content_type='application/pdf')
+
+    def _shopping_cart_items(self, user, key):
+        items = cache.get(f'{key}:items')
+        if items is None:
+            rows = (Ingredient.objects
+                    .filter(ingredient_recipes__recipe__cart_recipes=user)
+                    .values('name', 'measurement_unit')
+                    .annotate(total=Sum('ingredient_recipes__amount'))
+                    .order_by('name'))
+            items = [{'name': r['name'], 'unit': r['measurement_unit'],
+                      'amount': r['total']} for r in rows]
+            cache.set(f'{key}:items', items, SHOPPING_CART_TIMEOUT)
+        return items
+
+    def _shopping_cart_pdf(self, user, key):
+        pdf = cache.get(f'{key}:pdf')
+        if pdf is not None:
+            return BytesIO(pdf)
+        file = render_pdf_shopping_cart(
+            user, self._shopping_cart_items(user, key))
+        # большие списки не кладём в кэш целиком, а отдаём файлом
+        # кусками: память воркера не растёт вместе с корзиной
+        if file.seek(0, SEEK_END) <= SHOPPING_CART_CACHE_MAX_SIZE:
+            file.seek(0)
+            cache.set(f'{key}:pdf', file.read(), SHOPPING_CART_TIMEOUT)
+        file.seek(0)
+        return file
+
+    @action(detail=False, methods=('get',),
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(PDFRenderer, PlainTextRenderer,
+                              CSVRenderer, JSONExportRenderer))
+    def download_shopping_cart(self, request, format=None):
+        """
+        Список покупок: PDF по умолчанию, ?format=txt|csv|json, суффикс
+        .csv и т. п. (его роутер передаёт в `format`) или Accept —
+        дешёвые текстовые выгрузки из того же агрегата.
+        """
+        renderer = request.accepted_renderer
+        filename = f'shopping_list.{renderer.format}'
+        key = self._shopping_cart_key(request.user)
+
+        if renderer.format == PDFRenderer.format:
+            return FileResponse(self._shopping_cart_pdf(request.user, key),
+                                as_attachment=True, filename=filename,
+                                content_type=renderer.media_type)
+
+        writer = SHOPPING_CART_WRITERS[renderer.format]
+        response = StreamingHttpResponse(
+            writer(request.user, self._shopping_cart_items(request.user, key)),
+            content_type=f'{renderer.media_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
     # ------------- короткая ссылка ---------------
     @action(detail=True, methods=('get',), url_path='get-link',
             permission_classes=(AllowAny,))
     def get_link(self, request, pk=None):
-        code = get_random_string(SHORT_CODE_LENGTH)
+        code = shortlinks.encode(self.get_object().pk)
         short_url = request.build_absolute_uri(f'{SHORT_LINK_PATH}{code}')
         return Response({'short-link': short_url}, status=status.HTTP_200_OK)
+
+
+def short_link_redirect(request, code):
+    """/recipes/s/<code> → страница рецепта во фронтенде."""
+    recipe_id = shortlinks.resolve(code)
+    if recipe_id is None:
+        raise Http404('Короткая ссылка не найдена')
+    return redirect(f'{RECIPE_PAGE_PATH}{recipe_id}')
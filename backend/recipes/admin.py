@@ -1,7 +1,26 @@
 # backend/recipes/admin.py
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
+from django.db import transaction
+
+from .counters import batched_counters
 from .models import Ingredient, Recipe, RecipeIngredient, Favorite, ShoppingCart
+from .search import update_search_fields
+
+
+class BatchedCountersAdminMixin:
+    """
+    Удаление из админки каскадом удаляет избранное, корзины и подписки:
+    их счётчики сдвигаются одним UPDATE на значение, а не по строке.
+    """
+
+    def delete_model(self, request, obj):
+        with transaction.atomic(), batched_counters():
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic(), batched_counters():
+            super().delete_queryset(request, queryset)
 
 
 @admin.register(Ingredient)
@@ -29,11 +48,12 @@ class RecipeIngredientInline(admin.TabularInline):
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(BatchedCountersAdminMixin, admin.ModelAdmin):
     inlines = (RecipeIngredientInline,)
 
     list_display = (
-        'id', 'name', 'author', 'cooking_time', 'likes_count', 'in_cart_count'
+        'id', 'name', 'author', 'cooking_time',
+        'favorites_count', 'carts_count',
     )
     list_filter = ('author', 'ingredients', 'pub_date')
     search_fields = ('name', 'author__username')
@@ -50,17 +70,14 @@ class RecipeAdmin(admin.ModelAdmin):
         'pub_date',
     )
 
-    @admin.display(description=_('Добавили в избранное'))
-    def likes_count(self, obj):
-        return obj.favorites.count()
-
-    @admin.display(description=_('Добавили в корзину'))
-    def in_cart_count(self, obj):
-        return obj.carts.count()
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # вектор зависит и от инлайнов с ингредиентами
+        update_search_fields(Recipe.objects.filter(pk=form.instance.pk))
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(BatchedCountersAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
     list_filter = ('user',)
     search_fields = ('user__email', 'recipe__name')
@@ -69,7 +86,7 @@ class FavoriteAdmin(admin.ModelAdmin):
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(BatchedCountersAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
     list_filter = ('user',)
     search_fields = ('user__email', 'recipe__name')
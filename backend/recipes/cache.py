@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import get_random_string
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+VERSION_KEY = 'version:{}'
+VERSION_LENGTH = 12
+INGREDIENTS_VERSION = 'ingredients'
+RECIPES_VERSION = 'recipes'         # состав ленты: создание / удаление
+CART_VERSION = 'cart:{}'            # корзина конкретного пользователя
+FAVORITES_VERSION = 'favorites:{}'  # избранное конкретного пользователя
+SUBSCRIPTIONS_VERSION = 'subscriptions:{}'
+RECIPE_VERSION = 'recipe:{}'        # карточка конкретного рецепта
+USER_VERSION = 'user:{}'            # публичный профиль (имя, аватар)
+# ─────────────────────────────────────────────────────────────────────
+
+
+def get_version(name):
+    """
+    Текущая версия набора данных `name`.
+
+    Версия — случайный токен в общем кэше: его смена делает устаревшими
+    все ключи, в которые он входит, во всех процессах сразу.
+    """
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, get_random_string(VERSION_LENGTH), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*names):
+    """Версии нескольких наборов данных за одно обращение к кэшу."""
+    keys = [VERSION_KEY.format(name) for name in names]
+    found = cache.get_many(keys)
+    return tuple(
+        found.get(key) or get_version(name) for key, name in zip(keys, names)
+    )
+
+
+def bump_version(*names):
+    """Выдаёт новые версии для перечисленных наборов данных."""
+    cache.set_many(
+        {VERSION_KEY.format(name): get_random_string(VERSION_LENGTH)
+         for name in names},
+        timeout=None,
+    )
+
+
+def bump_version_on_commit(*names):
+    """
+    bump_version() после коммита текущей транзакции: иначе параллельный
+    запрос успеет закэшировать старые данные под новой версией.
+    """
+    if names:
+        transaction.on_commit(lambda: bump_version(*names))
+
+
+def bump_cart_versions(user_ids):
+    """Корзины этих пользователей изменились."""
+    bump_version_on_commit(
+        *(CART_VERSION.format(user_id) for user_id in user_ids))
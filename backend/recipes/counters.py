@@ -0,0 +1,131 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+# (модель со счётчиком, поле, кого считаем, FK на модель со счётчиком)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscriptions_count', Subscription, 'user'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+COUNTED_MODELS = tuple({source for _, _, source, _ in COUNTERS})
+# ─────────────────────────────────────────────────────────────────────
+
+_local = threading.local()
+
+
+def change_counters(model, pks, field, delta):
+    """
+    Атомарно сдвигает денормализованный счётчик у набора строк одним
+    UPDATE … SET f = f + delta. Вниз не уходит ниже нуля, даже если
+    счётчик успел разъехаться.
+    """
+    value = F(field) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    model.objects.filter(pk__in=pks).update(**{field: value})
+
+
+def _counted_by(source):
+    return [
+        (model, field, source._meta.get_field(fk).attname)
+        for model, field, counted, fk in COUNTERS if counted is source
+    ]
+
+
+def _apply(model, field, deltas):
+    """{pk: сдвиг} → по одному UPDATE на каждое значение сдвига."""
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        change_counters(model, pks, field, delta)
+
+
+def _shift(model, field, deltas):
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        _apply(model, field, deltas)
+        return
+    for pk, delta in deltas.items():
+        pending[model, field][pk] += delta
+
+
+@contextmanager
+def batched_counters():
+    """
+    Внутри блока сдвиги счётчиков копятся и пишутся на выходе: удаление
+    сотни строк (или каскад от рецепта) — это несколько UPDATE, а не
+    сотня. Использовать внутри транзакции: при исключении накопленное
+    отбрасывается вместе с её откатом.
+    """
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    pending = _local.pending = defaultdict(lambda: defaultdict(int))
+    try:
+        yield
+    finally:
+        _local.pending = None
+    for (model, field), deltas in pending.items():
+        _apply(model, field, deltas)
+
+
+def _counted_values(instance):
+    # только уже загруженные значения: отложенное поле не тянем из БД
+    return {
+        attname: instance.__dict__.get(attname)
+        for _, _, attname in _counted_by(type(instance))
+    }
+
+
+def remember_counted(instance):
+    """post_init: FK, по которым строку считают, — до правки."""
+    instance._counted_values = _counted_values(instance)
+
+
+def counted_saved(instance, created):
+    """post_save: новая строка или строка, перенесённая на другой FK."""
+    old = getattr(instance, '_counted_values', {})
+    new = _counted_values(instance)
+    for model, field, attname in _counted_by(type(instance)):
+        before, after = old.get(attname), new[attname]
+        if created:
+            _shift(model, field, {after: 1})
+        elif None not in (before, after) and before != after:
+            _shift(model, field, {before: -1})
+            _shift(model, field, {after: 1})
+    instance._counted_values = new
+
+
+def counted_deleted(instance):
+    """post_delete: в том числе каскадное удаление."""
+    for model, field, attname in _counted_by(type(instance)):
+        _shift(model, field, {getattr(instance, attname): -1})
+
+
+def actual_count(model, fk):
+    """Подзапрос «сколько строк model ссылается на объект через fk»."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{fk: OuterRef('pk')})
+            .order_by()
+            .values(fk)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
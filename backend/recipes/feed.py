@@ -0,0 +1,65 @@
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+# у автора с таким числом подписчиков рецепты не рассылаются:
+# лента добирает их при чтении (fan-out on read)
+FANOUT_FOLLOWERS_LIMIT = 5_000
+FANOUT_BATCH_SIZE = 1_000
+FEED_BACKFILL_SIZE = 100        # последних рецептов автора при подписке
+# ─────────────────────────────────────────────────────────────────────
+
+
+def is_fanned_out(author):
+    return author.followers_count < FANOUT_FOLLOWERS_LIMIT
+
+
+def _insert(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out_recipe(recipe):
+    """Новый рецепт — в ленты всех подписчиков автора."""
+    if not is_fanned_out(recipe.author):
+        return
+    followers = (Subscription.objects.filter(author_id=recipe.author_id)
+                 .values_list('user_id', flat=True))
+    _insert(FeedEntry(user_id=user_id, recipe_id=recipe.pk)
+            for user_id in followers.iterator(chunk_size=FANOUT_BATCH_SIZE))
+
+
+def backfill_feed(user, author):
+    """После подписки в ленте сразу есть последние рецепты автора."""
+    if not is_fanned_out(author):
+        return
+    recipe_ids = (Recipe.objects.filter(author=author).order_by('-id')
+                  .values_list('id', flat=True)[:FEED_BACKFILL_SIZE])
+    _insert(FeedEntry(user=user, recipe_id=recipe_id)
+            for recipe_id in recipe_ids)
+
+
+def trim_feed(user, author):
+    """После отписки рецепты автора из ленты убираются."""
+    FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def feed_recipes(recipes, user):
+    """
+    Рецепты ленты из queryset `recipes`.
+
+    Обычно это только разосланные записи: JOIN по уникальному индексу
+    (user, recipe) читается с конца и отдаёт страницу, не трогая
+    остальные рецепты. Если пользователь подписан на «крупных» авторов,
+    их рецепты добираются при чтении: UNION внутри одного IN (...), а не
+    OR двух условий, который свёл бы запрос к просмотру всех рецептов.
+    """
+    pulled_authors = list(user.subscriptions.filter(
+        author__followers_count__gte=FANOUT_FOLLOWERS_LIMIT,
+    ).values_list('author_id', flat=True))
+    if not pulled_authors:
+        return recipes.filter(feed_entries__user=user)
+    pulled = (Recipe.objects.filter(author__in=pulled_authors)
+              .order_by().values('id'))
+    return recipes.filter(pk__in=FeedEntry.objects.filter(user=user)
+                          .values('recipe_id').union(pulled))
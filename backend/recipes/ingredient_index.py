@@ -0,0 +1,67 @@
+import bisect
+import threading
+from itertools import islice
+
+from recipes.cache import INGREDIENTS_VERSION, get_version
+from recipes.models import Ingredient
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+SEARCH_LIMIT = 50       # максимум подсказок в автодополнении
+# ─────────────────────────────────────────────────────────────────────
+
+
+class IngredientIndex:
+    """
+    Локальный для процесса индекс ингредиентов для автодополнения.
+
+    Хранит ингредиенты, отсортированные по casefold-названию, и ищет
+    префикс бинарным поиском без обращения к БД. Снимок перечитывается,
+    когда в кэше меняется версия INGREDIENTS_VERSION (см. recipes.signals).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (версия, ключи, ингредиенты) — заменяется одним присваиванием,
+        # чтобы поток не увидел новые ключи вместе со старым списком
+        self._data = (None, [], [])
+
+    def _load(self, version):
+        items = sorted(
+            Ingredient.objects.all(),
+            key=lambda item: (item.name.casefold(), item.id),
+        )
+        self._data = (version, [item.name.casefold() for item in items],
+                      items)
+
+    def _snapshot(self):
+        version = get_version(INGREDIENTS_VERSION)
+        data = self._data
+        if version != data[0]:
+            with self._lock:
+                if version != self._data[0]:
+                    self._load(version)
+                data = self._data
+        return data[1], data[2]
+
+    def search(self, name, limit=SEARCH_LIMIT):
+        """
+        Ингредиенты, чьё название начинается с `name` (без учёта регистра),
+        а за ними, до `limit`, — те, где `name` встречается внутри названия.
+        """
+        keys, items = self._snapshot()
+        needle = name.casefold()
+
+        start = bisect.bisect_left(keys, needle)
+        end = bisect.bisect_left(keys, needle + '\U0010ffff', lo=start)
+        found = items[start:min(end, start + limit)]
+        if len(found) < limit:
+            # префиксные совпадения лежат в [start, end) — их пропускаем
+            found.extend(islice(
+                (item for key, item in zip(keys, items)
+                 if needle in key and not key.startswith(needle)),
+                limit - len(found),
+            ))
+        return found
+
+
+ingredient_index = IngredientIndex()
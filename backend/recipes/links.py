@@ -0,0 +1,73 @@
+from django.db import connection
+from django.db.models.signals import post_save
+
+
+def _insert_sql(model, objs):
+    """INSERT … ON CONFLICT DO NOTHING для набора несохранённых объектов."""
+    fields = [field for field in model._meta.concrete_fields
+              if not field.primary_key]
+    params = [
+        # значения по умолчанию и auto_now_add — как при save()
+        field.get_db_prep_save(field.pre_save(obj, add=True), connection)
+        for obj in objs
+        for field in fields
+    ]
+    quote = connection.ops.quote_name
+    row = '({})'.format(', '.join(['%s'] * len(fields)))
+    sql = 'INSERT INTO {} ({}) VALUES {} ON CONFLICT DO NOTHING'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join([row] * len(objs)),
+    )
+    return sql, params
+
+
+def _inserted(model, obj, pk):
+    """Вставка мимо save(): pk и post_save (счётчики) — как у save()."""
+    obj.pk = pk
+    obj._state.adding = False
+    post_save.send(sender=model, instance=obj, created=True, raw=False,
+                   using=connection.alias, update_fields=None)
+
+
+def insert_ignore(model, **values):
+    """
+    INSERT … ON CONFLICT DO NOTHING одной командой.
+
+    True — строка добавлена, False — такая уже есть (её мог вставить и
+    параллельный запрос): решает уникальный индекс, а не SELECT перед
+    вставкой, поэтому двойной клик не превращается в IntegrityError.
+    """
+    obj = model(**values)
+    sql, params = _insert_sql(model, [obj])
+    pk_column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{sql} RETURNING {pk_column}', params)
+        row = cursor.fetchone()
+    if row is None:
+        return False
+    _inserted(model, obj, row[0])
+    return True
+
+
+def bulk_insert_ignore(model, objs, returning):
+    """
+    Пакетный insert_ignore(): одна команда на все объекты. Поле
+    `returning` различает объекты внутри пакета; возвращает множество
+    его значений у реально вставленных строк.
+    """
+    if not objs:
+        return set()
+    sql, params = _insert_sql(model, objs)
+    attname = model._meta.get_field(returning).attname
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{sql} RETURNING {quote(model._meta.pk.column)}, '
+            f'{quote(model._meta.get_field(returning).column)}', params)
+        inserted = {value: pk for pk, value in cursor.fetchall()}
+    for obj in objs:
+        value = getattr(obj, attname)
+        if value in inserted:
+            _inserted(model, obj, inserted[value])
+    return set(inserted)
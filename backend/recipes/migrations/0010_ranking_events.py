@@ -0,0 +1,55 @@
+# Generated by Django 5.0.4 on 2026-10-18 04:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_events(apps, schema_editor):
+    # уже учтённые в рейтинге добавления: всё, что не позже водяного знака
+    RecipeRanking = apps.get_model('recipes', 'RecipeRanking')
+    RankingEvent = apps.get_model('recipes', 'RankingEvent')
+    since = RecipeRanking.objects.aggregate(
+        last=models.Max('last_event'))['last']
+    if since is None:
+        return
+    for model_name in ('favorite', 'shoppingcart'):
+        rows = (apps.get_model('recipes', model_name).objects
+                .filter(created__lte=since)
+                .values_list('user_id', 'recipe_id'))
+        RankingEvent.objects.bulk_create(
+            (RankingEvent(user_id=user_id, recipe_id=recipe_id,
+                          kind=model_name)
+             for user_id, recipe_id in rows.iterator(chunk_size=1000)),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_feed_entries'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=32, verbose_name='Событие')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Учтённое событие рейтинга',
+                'verbose_name_plural': 'Учтённые события рейтинга',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rankingevent',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe', 'kind'), name='unique_ranking_event'),
+        ),
+        migrations.RunPython(fill_events, migrations.RunPython.noop),
+    ]
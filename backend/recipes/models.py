@@ -1,4 +1,7 @@
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -61,6 +64,7 @@ class Recipe(models.Model):
     name = models.CharField(max_length=256, verbose_name=_('Название'))
     image = models.ImageField(
         upload_to='recipes/images/',
+        db_index=True,     # файлы общие: перед удалением ищем ссылки
         verbose_name=_('Фото блюда'),
     )
     text = models.TextField(verbose_name=_('Описание'))
@@ -81,11 +85,46 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name=_('Дата публикации'),
     )
+    # ↓↓↓ денормализованные счётчики, правятся F()-апдейтами
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Добавили в избранное'),
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('Добавили в корзину'),
+    )
+    # ↓↓↓ поля для поиска, пересчитываются в
+    # recipes.search.update_search_fields:
+    # полнотекстовый вектор (название, ингредиенты, описание)…
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name=_('Поисковый вектор'),
+    )
+    # …и id ингредиентов для фильтров «всё из / любое из / без»
+    ingredient_ids = ArrayField(
+        models.BigIntegerField(),
+        default=list,
+        editable=False,
+        verbose_name=_('Id ингредиентов'),
+    )
 
     class Meta:
         verbose_name = _('Рецепт')
         verbose_name_plural = _('Рецепты')
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                (models.F('favorites_count') + models.F('carts_count')).desc(),
+                name='recipe_popularity_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+            GinIndex(fields=['ingredient_ids'],
+                     name='recipe_ingredient_ids_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -140,6 +179,11 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name=_('Рецепт'),
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name=_('Добавлено'),
+    )
 
     class Meta:
         verbose_name = _('Избранный рецепт')
@@ -169,6 +213,11 @@ class ShoppingCart(models.Model):
         related_name='in_carts',
         verbose_name=_('Рецепт'),
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name=_('Добавлено'),
+    )
 
     class Meta:
         verbose_name = _('Запись в корзине')
@@ -183,3 +232,113 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} → {self.recipe}'
+
+
+class RecipeRanking(models.Model):
+    """
+    Сводная таблица для ленты «в тренде».
+
+    trending_score = ln Σ w·e^{λ(t − EPOCH)} по добавлениям в избранное
+    и корзину: общий множитель затухания e^{−λ(now − EPOCH)} на порядок
+    не влияет, поэтому старые строки при пересчёте трогать не нужно.
+    Заполняется командой refresh_rankings.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name=_('Рецепт'),
+    )
+    trending_score = models.FloatField(
+        db_index=True,
+        verbose_name=_('Рейтинг «в тренде»'),
+    )
+    last_event = models.DateTimeField(
+        db_index=True,
+        verbose_name=_('Последнее учтённое событие'),
+    )
+
+    class Meta:
+        verbose_name = _('Рейтинг рецепта')
+        verbose_name_plural = _('Рейтинги рецептов')
+
+    def __str__(self):
+        return f'{self.recipe} — {self.trending_score:.2f}'
+
+
+class RankingEvent(models.Model):
+    """
+    Добавление в избранное / корзину, уже учтённое в trending_score.
+    Повторное добавление тем же пользователем (после удаления) рейтинг
+    не поднимает: иначе его можно накрутить, переключая кнопку.
+    Ведётся командой refresh_rankings.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Пользователь'),
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Рецепт'),
+    )
+    kind = models.CharField(
+        max_length=32,
+        verbose_name=_('Событие'),   # model_name: favorite / shoppingcart
+    )
+
+    class Meta:
+        verbose_name = _('Учтённое событие рейтинга')
+        verbose_name_plural = _('Учтённые события рейтинга')
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe', 'kind'),
+                name='unique_ranking_event',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} → {self.recipe} ({self.kind})'
+
+
+class FeedEntry(models.Model):
+    """
+    Лента подписок: рецепт, разосланный подписчику при публикации
+    (fan-out on write). Рецепты авторов с очень большим числом
+    подписчиков сюда не пишутся — их лента добирает при чтении,
+    см. recipes.feed.
+
+    Таблица, а не sorted set в Redis: Redis здесь — кэш с вытеснением
+    (allkeys-lru), а лента — данные, которые нельзя терять; к тому же
+    строки уходят каскадом вместе с рецептом и пользователем.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name=_('Подписчик'),
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name=_('Рецепт'),
+    )
+
+    class Meta:
+        verbose_name = _('Запись ленты')
+        verbose_name_plural = _('Записи ленты')
+        constraints = [
+            # уникальный индекс (user, recipe) обслуживает и чтение ленты
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} ← {self.recipe}'
@@ -0,0 +1,128 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+# имя → наибольшая сторона; от большего к меньшему: меньшие режем
+# из уже уменьшенной копии, а не из оригинала
+RENDITION_SIZES = {'medium': 720, 'small': 360}
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+RENDITION_WORKERS = 2
+# ─────────────────────────────────────────────────────────────────────
+
+_executor = ThreadPoolExecutor(max_workers=RENDITION_WORKERS,
+                               thread_name_prefix='renditions')
+
+
+def rendition_name(name, size, fmt):
+    """recipes/images/abc.png → recipes/images/abc.png.small.webp (рядом)."""
+    return f'{name}.{size}.{fmt}'
+
+
+def _done_name(name):
+    # последним пишется самый маленький JPEG — по нему и проверяем
+    return rendition_name(name, next(reversed(RENDITION_SIZES)),
+                          next(reversed(RENDITION_FORMATS)))
+
+
+def rendition_urls(fieldfile):
+    """
+    {размер: {формат: url}} для сохранённого файла.
+
+    Превью режутся в фоне и могут ещё (или вовсе) не существовать: пока
+    набор не нарезан целиком, на всех местах — ссылка на оригинал, чтобы
+    клиент не получал 404. Проверка — одна, по последнему файлу набора.
+    """
+    storage, name = fieldfile.storage, fieldfile.name
+    if not storage.exists(_done_name(name)):
+        original = storage.url(name)
+        return {size: dict.fromkeys(RENDITION_FORMATS, original)
+                for size in RENDITION_SIZES}
+    return {
+        size: {fmt: storage.url(rendition_name(name, size, fmt))
+               for fmt in RENDITION_FORMATS}
+        for size in RENDITION_SIZES
+    }
+
+
+def _flatten(img):
+    """JPEG не умеет прозрачность: кладём картинку на белый фон."""
+    if img.mode != 'RGBA':
+        return img
+    background = Image.new('RGB', img.size, 'white')
+    background.paste(img, mask=img.getchannel('A'))
+    return background
+
+
+def _save_exact(storage, name, content):
+    # контент-адресное хранилище переименовало бы превью в хеш
+    if hasattr(storage, 'save_derived'):
+        storage.save_derived(name, content)
+    else:
+        storage.delete(name)
+        storage.save(name, content)
+
+
+def make_renditions(storage, name):
+    """
+    Режет все размеры и форматы одного изображения. Имена загрузок
+    уникальны, поэтому уже нарезанный файл повторно не обрабатывается.
+    True — превью нарезаны сейчас.
+    """
+    if storage.exists(_done_name(name)):
+        return False
+    with storage.open(name) as src, Image.open(src) as original:
+        largest = max(RENDITION_SIZES.values())
+        # JPEG декодируется сразу в уменьшенном масштабе (1/2…1/8)
+        original.draft('RGB', (largest, largest))
+        img = ImageOps.exif_transpose(original)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert(
+                'RGBA' if img.has_transparency_data else 'RGB')
+        for size, side in RENDITION_SIZES.items():
+            img.thumbnail((side, side), Image.LANCZOS)
+            variants = {'webp': img, 'jpeg': _flatten(img)}
+            for fmt, (pil_format, options) in RENDITION_FORMATS.items():
+                buf = BytesIO()
+                variants[fmt].save(buf, pil_format, **options)
+                _save_exact(storage, rendition_name(name, size, fmt),
+                            ContentFile(buf.getvalue()))
+    return True
+
+
+def delete_renditions(storage, name):
+    for size in RENDITION_SIZES:
+        for fmt in RENDITION_FORMATS:
+            storage.delete(rendition_name(name, size, fmt))
+
+
+def _run(storage, name, on_done):
+    try:
+        if make_renditions(storage, name) and on_done:
+            on_done()
+    except Exception:
+        # битая картинка не должна ронять воркер; оригинал остаётся
+        logger.exception('Не удалось нарезать превью для %s', name)
+
+
+def schedule_renditions(fieldfile, on_done=None):
+    """
+    Нарезка в пуле потоков после коммита: запрос не ждёт Pillow,
+    а воркер не читает файл откатившейся транзакции. on_done()
+    вызывается, когда превью готовы, — например, чтобы сбросить кэш
+    ответов, в которые попали ссылки на оригинал.
+    """
+    if not fieldfile:
+        return
+    storage, name = fieldfile.storage, fieldfile.name
+    transaction.on_commit(
+        lambda: _executor.submit(_run, storage, name, on_done))
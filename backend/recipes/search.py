@@ -0,0 +1,80 @@
+from django.contrib.postgres.aggregates import ArrayAgg, StringAgg
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector,
+)
+from django.db.models import (
+    BigIntegerField, F, OuterRef, Subquery, TextField, Value,
+)
+from django.db.models.functions import Coalesce
+
+from recipes.models import RecipeIngredient
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+SEARCH_CONFIG = 'russian'
+# ─────────────────────────────────────────────────────────────────────
+
+
+def search_vector():
+    """
+    Выражение для Recipe.search_vector: название важнее ингредиентов,
+    ингредиенты важнее описания.
+    """
+    ingredient_names = Subquery(
+        RecipeIngredient.objects
+        .filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(names=StringAgg('ingredient__name', ' '))
+        .values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Coalesce(ingredient_names, Value(''),
+                                output_field=TextField()),
+                       weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def ingredient_ids():
+    """Выражение для Recipe.ingredient_ids: отсортированный массив id."""
+    return Coalesce(
+        Subquery(
+            RecipeIngredient.objects
+            .filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(ids=ArrayAgg('ingredient_id', ordering='ingredient_id'))
+            .values('ids')
+        ),
+        Value([]),
+        output_field=ArrayField(BigIntegerField()),
+    )
+
+
+def update_search_fields(recipes):
+    """Пересчитывает поисковые поля одним UPDATE для queryset рецептов."""
+    recipes.update(search_vector=search_vector(),
+                   ingredient_ids=ingredient_ids())
+
+
+def filter_by_ingredients(recipes, all_of=(), any_of=(), none_of=()):
+    """
+    Фильтры по ингредиентам через операторы массивов (@>, &&),
+    которые обслуживает GIN-индекс recipe_ingredient_ids_idx.
+    """
+    if all_of:
+        recipes = recipes.filter(ingredient_ids__contains=list(all_of))
+    if any_of:
+        recipes = recipes.filter(ingredient_ids__overlap=list(any_of))
+    if none_of:
+        recipes = recipes.exclude(ingredient_ids__overlap=list(none_of))
+    return recipes
+
+
+def search_recipes(recipes, text):
+    """Фильтр по GIN-индексу и аннотация rank для сортировки."""
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    return recipes.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query))
@@ -0,0 +1,95 @@
+import string
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from recipes.models import Recipe
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+LOCAL_CACHE_SIZE = 1024         # «горячие» коды в памяти процесса
+SHORT_LINK_KEY = 'short_link:{}'
+SHORT_LINK_TIMEOUT = 60 * 60 * 24
+# ─────────────────────────────────────────────────────────────────────
+
+
+def encode(recipe_id):
+    """Короткий код рецепта: id в base62, у рецепта он всегда один."""
+    code = ''
+    while True:
+        recipe_id, rest = divmod(recipe_id, BASE)
+        code = ALPHABET[rest] + code
+        if not recipe_id:
+            return code
+
+
+def decode(code):
+    """Обратное к encode(); ValueError для чужих символов."""
+    recipe_id = 0
+    for char in code:
+        recipe_id = recipe_id * BASE + ALPHABET.index(char)
+    return recipe_id
+
+
+class _LocalCache:
+    """Маленький LRU существующих id рецептов в памяти процесса."""
+
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._data.move_to_end(key)
+            return True
+
+    def add(self, key):
+        with self._lock:
+            self._data[key] = True
+            self._data.move_to_end(key)
+            if len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+_local = _LocalCache(LOCAL_CACHE_SIZE)
+
+
+def resolve(code):
+    """
+    Id рецепта по короткому коду или None.
+
+    Порядок: LRU процесса → общий кэш → БД. Кэшируются только
+    существующие рецепты, поэтому новый рецепт с «чужим» кодом
+    находится сразу.
+    """
+    if not code:
+        return None
+    try:
+        recipe_id = decode(code)
+    except ValueError:
+        return None
+    if recipe_id in _local:
+        return recipe_id
+
+    key = SHORT_LINK_KEY.format(recipe_id)
+    if not cache.get(key):
+        if not Recipe.objects.filter(pk=recipe_id).exists():
+            return None
+        cache.set(key, True, SHORT_LINK_TIMEOUT)
+    _local.add(recipe_id)
+    return recipe_id
+
+
+def forget(recipe_id):
+    """Рецепт удалён — ссылка больше не должна резолвиться."""
+    cache.delete(SHORT_LINK_KEY.format(recipe_id))
+    _local.discard(recipe_id)
@@ -0,0 +1,190 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete,
+)
+from django.dispatch import receiver
+
+from recipes import shortlinks
+from recipes.cache import (
+    FAVORITES_VERSION, INGREDIENTS_VERSION, RECIPE_VERSION, RECIPES_VERSION,
+    USER_VERSION, bump_cart_versions, bump_version, bump_version_on_commit,
+)
+from recipes.counters import (
+    COUNTED_MODELS, counted_deleted, counted_saved, remember_counted,
+)
+from recipes.feed import fan_out_recipe
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from recipes.renditions import schedule_renditions
+from recipes.search import update_search_fields
+from recipes.storage import release
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+# поля пользователя, которые видны в UserSerializer
+PUBLIC_USER_FIELDS = {'username', 'first_name', 'last_name', 'email', 'avatar'}
+# ─────────────────────────────────────────────────────────────────────
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(**kwargs):
+    """
+    Любая правка ингредиента сбрасывает индексы и кэши справочника —
+    после коммита: админка пишет в транзакции, и параллельный запрос
+    иначе закэшировал бы старые строки под новой версией.
+    """
+    bump_version_on_commit(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(instance, created, **kwargs):
+    """Название ингредиента входит в поисковый вектор рецептов."""
+    if not created:
+        update_search_fields(
+            Recipe.objects.filter(recipe_ingredients__ingredient=instance))
+        bump_version_on_commit(RECIPES_VERSION)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def remember_ingredient_recipes(instance, **kwargs):
+    """Строки состава уйдут каскадом — рецепты запоминаем до удаления."""
+    instance._recipe_ids = list(
+        Recipe.objects.filter(recipe_ingredients__ingredient=instance)
+        .values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(instance, **kwargs):
+    """Удалённый ингредиент больше не находится ни поиском, ни фильтром."""
+    recipe_ids = getattr(instance, '_recipe_ids', ())
+    if recipe_ids:
+        update_search_fields(Recipe.objects.filter(pk__in=recipe_ids))
+        bump_version_on_commit(RECIPES_VERSION)
+
+
+# ------------- денормализованные счётчики ----------------------------
+# Любой путь записи — API, админка, shell, каскад от удаления
+# пользователя или рецепта — двигает счётчики через эти сигналы.
+def counted_init(instance, **kwargs):
+    remember_counted(instance)
+
+
+def counted_post_save(instance, created, raw, **kwargs):
+    if not raw:
+        counted_saved(instance, created)
+
+
+def counted_post_delete(instance, **kwargs):
+    counted_deleted(instance)
+
+
+for _model in COUNTED_MODELS:
+    post_init.connect(counted_init, sender=_model)
+    post_save.connect(counted_post_save, sender=_model)
+    post_delete.connect(counted_post_delete, sender=_model)
+
+
+# ------------- кэши избранного и корзины ------------------------------
+# Как и счётчики — с любого пути записи: API, админка, каскад от
+# удаления рецепта или пользователя. Версии меняются после коммита.
+@receiver((post_save, post_delete), sender=Favorite)
+def favorites_changed(instance, **kwargs):
+    bump_version_on_commit(FAVORITES_VERSION.format(instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def cart_changed(instance, **kwargs):
+    bump_cart_versions((instance.user_id,))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_in_carts_changed(instance, created, update_fields, **kwargs):
+    """
+    Полное сохранение (админка, в том числе с инлайном ингредиентов)
+    могло поменять состав — списки покупок с этим рецептом устарели.
+    API сохраняет только присланные поля и состав сверяет сам.
+    """
+    if not created and update_fields is None:
+        bump_cart_versions(ShoppingCart.objects.filter(recipe=instance)
+                           .values_list('user_id', flat=True))
+
+
+# ------------- файлы: превью и сборка осиротевших --------------------
+def _remember_file(instance, field):
+    """Имя файла из БД — чтобы после замены освободить старый."""
+    value = instance.__dict__.get(field)
+    setattr(instance, f'_stored_{field}', getattr(value, 'name', value))
+
+
+def _file_saved(instance, field, update_fields, version):
+    if update_fields is not None and field not in update_fields:
+        return
+    fieldfile = getattr(instance, field)
+    # кэшированные ответы со ссылками на оригинал вместо превью устарели
+    schedule_renditions(fieldfile, on_done=lambda: bump_version(version))
+    old = getattr(instance, f'_stored_{field}', None)
+    if old and old != fieldfile.name:
+        # файлы общие (имя = хеш): удаляем, только если ссылок не осталось
+        transaction.on_commit(lambda: release(fieldfile.storage, old))
+    setattr(instance, f'_stored_{field}', fieldfile.name)
+
+
+def _file_deleted(instance, field):
+    fieldfile = getattr(instance, field)
+    name = fieldfile.name
+    transaction.on_commit(lambda: release(fieldfile.storage, name))
+
+
+@receiver(post_init, sender=Recipe)
+def remember_image(instance, **kwargs):
+    _remember_file(instance, 'image')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(instance, update_fields, **kwargs):
+    _file_saved(instance, 'image', update_fields,
+                RECIPE_VERSION.format(instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    shortlinks.forget(instance.pk)
+    _file_deleted(instance, 'image')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    """Кэш карточки рецепта (GET /recipes/<id>/) устарел."""
+    bump_version_on_commit(RECIPE_VERSION.format(instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(instance, created, raw, **kwargs):
+    """
+    Новый рецепт — в ленты подписчиков, с любого пути создания (API,
+    админка). После коммита: рассылка не удлиняет транзакцию с рецептом.
+    """
+    if created and not raw:
+        transaction.on_commit(lambda: fan_out_recipe(instance))
+
+
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def remember_avatar(instance, **kwargs):
+    _remember_file(instance, 'avatar')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def avatar_saved(instance, update_fields, **kwargs):
+    _file_saved(instance, 'avatar', update_fields,
+                USER_VERSION.format(instance.pk))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def profile_changed(instance, update_fields, **kwargs):
+    """Профиль автора встроен в кэшированные карточки его рецептов."""
+    if update_fields is None or PUBLIC_USER_FIELDS & set(update_fields):
+        bump_version_on_commit(USER_VERSION.format(instance.pk))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(instance, **kwargs):
+    _file_deleted(instance, 'avatar')
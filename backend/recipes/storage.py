@@ -0,0 +1,106 @@
+import hashlib
+import os
+import posixpath
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+from recipes.models import Recipe
+from recipes.renditions import delete_renditions
+
+User = get_user_model()
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+# все поля, которые ссылаются на файлы хранилища
+MEDIA_FIELDS = (
+    (Recipe, 'image'),
+    (User, 'avatar'),
+)
+# столько секунд после записи или повторного использования файл не
+# удаляется: успевает закоммититься строка, которая на него сослалась
+RELEASE_GRACE_PERIOD = 60 * 60
+# ─────────────────────────────────────────────────────────────────────
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Имя файла — sha256 содержимого: recipes/images/ab/ab12….png.
+    Повторная загрузка тех же байтов ничего не пишет на диск и получает
+    то же имя, поэтому один файл может принадлежать нескольким объектам:
+    удаляет его только release(), когда ссылок не осталось.
+
+    Гонка «загрузка тех же байтов ↔ release() этого файла» закрыта так:
+    save() обновляет mtime существующего файла, а delete_if_stale()
+    сначала атомарно убирает файл в сторону и только потом смотрит на
+    mtime. Либо save() успел «тронуть» файл — и он возвращается на место,
+    либо не нашёл его — и записал заново.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        try:
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            return super().save(name, content, max_length)
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        ext = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + ext)
+
+    def save_derived(self, name, content):
+        """Производные файлы (превью) пишутся под точным именем."""
+        self.delete(name)
+        return super().save(name, content)
+
+    def delete_if_stale(self, name):
+        """
+        Удаляет файл, если его не записывали и не использовали повторно
+        последние RELEASE_GRACE_PERIOD секунд. True — файл удалён.
+        """
+        path = self.path(name)
+        aside = f'{path}.{uuid.uuid4().hex}.released'
+        try:
+            os.rename(path, aside)
+        except FileNotFoundError:
+            return False
+        if time.time() - os.stat(aside).st_mtime < RELEASE_GRACE_PERIOD:
+            os.replace(aside, path)
+            return False
+        os.remove(aside)
+        return True
+
+
+def is_referenced(name):
+    return any(model.objects.filter(**{field: name}).exists()
+               for model, field in MEDIA_FIELDS)
+
+
+def release(storage, name):
+    """
+    Удаляет файл и его превью, если на него больше никто не ссылается.
+    Недавно записанный файл остаётся до `media_usage --collect`.
+    True — файл удалён.
+    """
+    if not name or is_referenced(name):
+        return False
+    if hasattr(storage, 'delete_if_stale'):
+        if not storage.delete_if_stale(name):
+            return False
+    else:
+        storage.delete(name)
+    delete_renditions(storage, name)
+    return True
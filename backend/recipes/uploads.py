@@ -0,0 +1,139 @@
+import base64
+import binascii
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from tempfile import SpooledTemporaryFile
+
+from django.core.files import File
+from PIL import Image, ImageOps
+
+# ────────────────────────────  КОНСТАНТЫ  ────────────────────────────
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024      # как client_max_body_size в nginx
+MAX_IMAGE_PIXELS = 40_000_000           # ~ 8000 × 5000
+UPLOAD_SPOOL_MAX_SIZE = 1024 * 1024     # крупнее — во временный файл
+DECODE_CHUNK = 64 * 1024                # кратно 4 символам base64
+UPLOAD_WORKERS = 4
+UPLOAD_TIMEOUT = 15                     # секунд на декодирование
+# формат Pillow → (расширение, параметры перекодирования);
+# save_all сохраняет все кадры анимации
+UPLOAD_FORMATS = {
+    'JPEG': ('jpg', {'quality': 90}),
+    'PNG': ('png', {}),
+    'GIF': ('gif', {'save_all': True}),
+    'WEBP': ('webp', {'quality': 90, 'save_all': True}),
+}
+# ─────────────────────────────────────────────────────────────────────
+
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS,
+                               thread_name_prefix='uploads')
+
+
+class ImageUploadError(ValueError):
+    """Текст ошибки уходит клиенту в ответе 400."""
+
+
+def _check_deadline(deadline):
+    if deadline is not None and time.monotonic() > deadline:
+        raise ImageUploadError('Изображение обрабатывается слишком долго.')
+
+
+def _spooled():
+    return SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAX_SIZE)
+
+
+def decode_base64(data, deadline=None):
+    """
+    `data:image/...;base64,...` или голый base64 → файл с байтами.
+    Декодируем кусками, без второй полной копии в памяти; размер
+    проверяем ещё до декодирования, срок (time.monotonic()) — между
+    кусками.
+    """
+    if not isinstance(data, str) or not data:
+        raise ImageUploadError('Ожидается изображение в base64.')
+    start = 0
+    if data.startswith('data:'):
+        marker = data.find(';base64,')
+        if marker < 0:
+            raise ImageUploadError('Ожидается изображение в base64.')
+        start = marker + len(';base64,')
+    if (len(data) - start) * 3 // 4 > MAX_UPLOAD_SIZE:
+        raise ImageUploadError(
+            f'Файл больше {MAX_UPLOAD_SIZE // 1024 // 1024} МБ.')
+
+    out, tail = _spooled(), ''
+    try:
+        for pos in range(start, len(data), DECODE_CHUNK):
+            _check_deadline(deadline)
+            chunk = tail + ''.join(data[pos:pos + DECODE_CHUNK].split())
+            cut = len(chunk) - len(chunk) % 4
+            out.write(base64.b64decode(chunk[:cut], validate=True))
+            tail = chunk[cut:]
+        if tail:
+            out.write(base64.b64decode(tail + '=' * (-len(tail) % 4)))
+    except ImageUploadError:
+        out.close()
+        raise
+    except (binascii.Error, ValueError):
+        out.close()
+        raise ImageUploadError('Некорректный base64.')
+    out.seek(0)
+    return out
+
+
+def process_image(data, deadline=None):
+    """
+    Проверяет и перекодирует загрузку. Image.open читает только
+    заголовок, поэтому формат и размеры в пикселях (всех кадров
+    анимации) проверяются до распаковки; перекодирование выбрасывает
+    EXIF и «хвосты» файла.
+
+    Срок `deadline` проверяется между этапами: сама распаковка в Pillow
+    не прерывается, её время ограничено лишь MAX_IMAGE_PIXELS.
+    """
+    src = decode_base64(data, deadline)
+    try:
+        with Image.open(src) as img:
+            if img.format not in UPLOAD_FORMATS:
+                raise ImageUploadError(
+                    'Поддерживаются JPEG, PNG, GIF и WebP.')
+            width, height = img.size
+            frames = getattr(img, 'n_frames', 1)
+            if width * height * frames > MAX_IMAGE_PIXELS:
+                raise ImageUploadError(
+                    f'Изображение больше {MAX_IMAGE_PIXELS // 10**6} Мп.')
+            _check_deadline(deadline)
+            ext, options = UPLOAD_FORMATS[img.format]
+            pil_format = img.format
+            # поворот по EXIF без лишней копии кадра
+            ImageOps.exif_transpose(img, in_place=True)
+            if pil_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            _check_deadline(deadline)
+            out = _spooled()
+            img.save(out, pil_format, **options)
+    except ImageUploadError:
+        raise
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        raise ImageUploadError('Некорректный формат изображения.')
+    finally:
+        src.close()
+    out.seek(0)
+    return File(out, name=f'{uuid.uuid4().hex}.{ext}')
+
+
+def process_upload(data):
+    """
+    process_image() в ограниченном пуле: одновременно декодируется не
+    больше UPLOAD_WORKERS картинок на процесс, а запрос ждёт результат
+    не дольше UPLOAD_TIMEOUT. cancel() не останавливает уже начатую
+    задачу, поэтому тот же срок уходит в process_image(): опоздавшая
+    задача бросает работу на ближайшей проверке и освобождает воркер.
+    """
+    deadline = time.monotonic() + UPLOAD_TIMEOUT
+    future = _executor.submit(process_image, data, deadline)
+    try:
+        return future.result(timeout=UPLOAD_TIMEOUT)
+    except TimeoutError:
+        future.cancel()
+        raise ImageUploadError('Изображение обрабатывается слишком долго.')
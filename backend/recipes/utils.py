@@ -1,4 +1,6 @@
-from io import BytesIO
+import csv
+import json
+from tempfile import SpooledTemporaryFile
 from reportlab.pdfgen import canvas
 
 # Константы для рендеринга PDF
@@ -12,6 +14,12 @@ LINE_HEIGHT = 20
 PAGE_BOTTOM_Y = 40
 FONT_NAME = 'Helvetica'
 FONT_SIZE = 14
+# Пока PDF меньше порога — он в памяти, дальше уходит во временный файл
+PDF_SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def _line(index, item):
+    return f"{index}. {item['name']} ({item['unit']}) — {item['amount']}"
 
 
 def render_pdf_shopping_cart(user, items):
@@ -19,11 +27,12 @@ def render_pdf_shopping_cart(user, items):
     Генерирует PDF-файл со списком покупок для пользователя.
 
     :param user: экземпляр пользователя, для которого генерируется список
-    :param items: список словарей с ключами 'name', 'unit', 'amount'
-    :return: BytesIO с содержимым PDF
+    :param items: итерируемое словарей с ключами 'name', 'unit', 'amount'
+    :return: файловый объект с PDF, позиция в начале; до PDF_SPOOL_MAX_SIZE
+             держится в памяти, больше — на диске
     """
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer)
+    buffer = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    p = canvas.Canvas(buffer, pageCompression=1)
     p.setFont(FONT_NAME, FONT_SIZE)
 
     # Заголовок
@@ -42,8 +51,7 @@ def render_pdf_shopping_cart(user, items):
     # Печать строк списка
     y = LINE_START_Y
     for index, item in enumerate(items, start=1):
-        text = f"{index}. {item['name']} ({item['unit']}) — {item['amount']}"
-        p.drawString(PAGE_MARGIN_X, y, text)
+        p.drawString(PAGE_MARGIN_X, y, _line(index, item))
         y -= LINE_HEIGHT
 
         # Проверка на конец страницы
@@ -56,3 +64,39 @@ def render_pdf_shopping_cart(user, items):
     p.save()
     buffer.seek(0)
     return buffer
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def iter_text_shopping_cart(user, items):
+    """Список покупок простым текстом, построчно."""
+    yield f"Список покупок для {user.username}\n"
+    yield "Продукты:\n"
+    for index, item in enumerate(items, start=1):
+        yield _line(index, item) + "\n"
+
+
+def iter_csv_shopping_cart(user, items):
+    """Список покупок в CSV: name,measurement_unit,amount."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for item in items:
+        yield writer.writerow((item['name'], item['unit'], item['amount']))
+
+
+def iter_json_shopping_cart(user, items):
+    """Список покупок JSON-массивом, по элементу за раз."""
+    separator = '['
+    for item in items:
+        yield separator + json.dumps(
+            {'name': item['name'], 'measurement_unit': item['unit'],
+             'amount': item['amount']},
+            ensure_ascii=False,
+        )
+        separator = ','
+    yield '[]' if separator == '[' else ']'
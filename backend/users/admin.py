@@ -2,11 +2,13 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.safestring import mark_safe
 
+from recipes.admin import BatchedCountersAdminMixin
+
 from .models import CustomUser, Subscription
 
 
 @admin.register(CustomUser)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(BatchedCountersAdminMixin, BaseUserAdmin):
     list_display = (
         'id', 'username', 'full_name', 'email', 'avatar_tag',
         'recipes_count', 'subscriptions_count', 'followers_count',
@@ -35,27 +37,8 @@ class UserAdmin(BaseUserAdmin):
         """Сочетание имени и фамилии пользователя."""
         return f'{obj.first_name} {obj.last_name}'
 
-    @admin.display(description='Рецептов')
-    def recipes_count(self, obj):
-        """Сколько рецептов создал пользователь."""
-        return obj.recipes.count()
-
-    @admin.display(description='Подписок')
-    def subscriptions_count(self, obj):
-        """Сколько авторов подписано этим пользователем."""
-        return Subscription.objects.filter(
-            user=obj
-        ).count()
-
-    @admin.display(description='Подписчиков')
-    def followers_count(self, obj):
-        """Сколько подписчиков у пользователя."""
-        return Subscription.objects.filter(
-            author=obj
-        ).count()
-
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(BatchedCountersAdminMixin, admin.ModelAdmin):
     list_display = ('id', 'user', 'author')
     search_fields = ('user__username', 'author__username')
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_customuser_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='avatar',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='users/avatars/'),
+        ),
+    ]
@@ -9,7 +9,7 @@ USERNAME_REGEX = r'^[\w.@+-]+$'
 class CustomUser(AbstractUser):
     """Кастомный пользователь; логинимся по e-mail."""
     avatar = models.ImageField(
-        upload_to='users/avatars/', blank=True, null=True
+        upload_to='users/avatars/', blank=True, null=True, db_index=True
     )
     email = models.EmailField(unique=True, max_length=254)
     username = models.CharField(
@@ -18,6 +18,16 @@ class CustomUser(AbstractUser):
         validators=[RegexValidator(USERNAME_REGEX,
                                    'Разрешены буквы, цифры и @/./+/-/_')],
     )
+    # ↓↓↓ денормализованные счётчики, правятся F()-апдейтами
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Рецептов'
+    )
+    subscriptions_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Подписок'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']